@@ -0,0 +1,8 @@
+-- Created after the bulk load so COPY does not maintain them row by row
+CREATE INDEX ON plan (venue_id);
+CREATE INDEX ON prices (plan_id);
+CREATE INDEX ON event (plan_id);
+CREATE INDEX ON ticket (plan_id);
+CREATE INDEX ON review (plan_id);
+CREATE INDEX ON hierarchy (child_person_id);
+CREATE INDEX ON hierarchy (parent_person_id);
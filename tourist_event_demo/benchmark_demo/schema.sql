@@ -0,0 +1,107 @@
+-- Scratch schema for the synthetic benchmark (PostgreSQL).
+-- Mirrors the tables read by queries_demo, hierarchy_people_demo and the
+-- final layer of the currency job. Run it against a throwaway database.
+
+DROP TABLE IF EXISTS
+  review, ticket, event, prices, plan, category_child, category_main,
+  venue, city, countries, exchange_rates, currencies, hierarchy, people,
+  prices_converted, refresh_watermarks, rpt_dirty_plans, rpt_plan_stats,
+  rpt_plan_daily_tickets, rpt_city_weekday_plans, rpt_country_daily_tickets,
+  rpt_venue_events, rpt_category_prices
+CASCADE;
+
+CREATE TABLE countries (
+  country_id INTEGER PRIMARY KEY,
+  country_name VARCHAR(255)
+);
+
+CREATE TABLE city (
+  city_id INTEGER PRIMARY KEY,
+  city_name VARCHAR(255),
+  country_id INTEGER
+);
+
+CREATE TABLE venue (
+  venue_id INTEGER PRIMARY KEY,
+  venue_name VARCHAR(255),
+  city_id INTEGER
+);
+
+CREATE TABLE category_main (
+  category_main_id INTEGER PRIMARY KEY,
+  category_name VARCHAR(255)
+);
+
+CREATE TABLE category_child (
+  category_child_id INTEGER PRIMARY KEY,
+  category_main_id INTEGER,
+  category_name VARCHAR(255)
+);
+
+CREATE TABLE plan (
+  plan_id INTEGER PRIMARY KEY,
+  plan_name VARCHAR(255),
+  category_main_id INTEGER,
+  venue_id INTEGER,
+  dt_start TIMESTAMP,
+  status VARCHAR(20)
+);
+
+CREATE TABLE prices (
+  price_id INTEGER PRIMARY KEY,
+  plan_id INTEGER,
+  type VARCHAR(20),
+  import NUMERIC(20,6),
+  quantity INTEGER,
+  currency VARCHAR(5)
+);
+
+CREATE TABLE event (
+  event_id INTEGER PRIMARY KEY,
+  plan_id INTEGER,
+  venue_id INTEGER
+);
+
+CREATE TABLE ticket (
+  ticket_id INTEGER PRIMARY KEY,
+  plan_id INTEGER,
+  quantity INTEGER,
+  status VARCHAR(20),
+  created_at TIMESTAMP
+);
+
+CREATE TABLE review (
+  review_id INTEGER PRIMARY KEY,
+  plan_id INTEGER,
+  rating INTEGER,
+  comment TEXT,
+  status VARCHAR(20)
+);
+
+CREATE TABLE currencies (
+  currency_code VARCHAR(5) PRIMARY KEY,
+  currency_name VARCHAR(100),
+  is_active BOOLEAN,
+  last_updated TIMESTAMP
+);
+
+CREATE TABLE exchange_rates (
+  id SERIAL PRIMARY KEY,
+  rate_date TIMESTAMP,
+  source_currency VARCHAR(5),
+  target_currency VARCHAR(5),
+  rate NUMERIC(20,6),
+  is_live BOOLEAN,
+  created_at TIMESTAMP,
+  updated_at TIMESTAMP,
+  UNIQUE (rate_date, source_currency, target_currency)
+);
+
+CREATE TABLE people (
+  person_id VARCHAR(36)
+);
+
+CREATE TABLE hierarchy (
+  parent_person_id VARCHAR(36),
+  child_person_id VARCHAR(36)
+);
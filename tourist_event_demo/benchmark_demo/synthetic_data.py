@@ -0,0 +1,403 @@
+# synthetic_data.py
+"""
+Synthetic datasets for the tourist event model and the people hierarchy.
+
+Generates configurable-size data with realistic skew (a few big cities,
+popular plans that concentrate events, tickets and reviews), bulk-loads it
+into PostgreSQL with COPY and times the demo queries at each scale:
+
+    python synthetic_data.py --scales 1000 10000 100000 1000000 10000000
+
+`--scales` is the number of tickets; every other table is sized from it.
+Run it against a scratch database: schema.sql drops the tables it creates.
+"""
+import io
+import os
+import sys
+import time
+import uuid
+import random
+import logging
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+QUERIES_DIR = os.path.join(CURRENT_DIR, '..', 'queries_demo')
+HIERARCHY_DIR = os.path.join(CURRENT_DIR, '..', 'hierarchy_people_demo')
+sys.path.append(QUERIES_DIR)
+sys.path.append(HIERARCHY_DIR)
+
+from report_runner import REPORTS, ReportQuery
+from hierarchy_engine import load_graph
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+START_DATE = datetime(2024, 1, 1)
+DAYS = 730
+CATEGORIES = ['Music', 'Theatre', 'Museums', 'Food', 'Nightlife', 'Tours', 'Sports', 'Kids']
+CURRENCY_WEIGHTS = {'USD': 0.4, 'EUR': 0.45, 'GBP': 0.15}
+PLAN_STATUS_WEIGHTS = {'ACTIVE': 0.85, 'INACTIVE': 0.1, 'SUSPENDED': 0.05}
+TICKET_STATUS_WEIGHTS = {'PAID': 0.85, 'PENDING': 0.1, 'CANCELLED': 0.05}
+REVIEW_STATUS_WEIGHTS = {'APPROVED': 0.8, 'PENDING': 0.15, 'REJECTED': 0.05}
+
+# Postgres port of hierarchy_people_demo/recursive_demo.sql (QUALIFY -> DISTINCT ON)
+RECURSIVE_HIERARCHY_QUERY = """
+    WITH RECURSIVE ancestry AS (
+        SELECT
+            p.person_id,
+            h.parent_person_id,
+            COALESCE(h.parent_person_id, p.person_id) as ancestor_person_id,
+            1 as level
+        FROM people p
+        LEFT JOIN hierarchy h ON p.person_id = h.child_person_id
+
+        UNION ALL
+
+        SELECT
+            a.person_id,
+            a.parent_person_id,
+            COALESCE(h.parent_person_id, a.ancestor_person_id) as ancestor_person_id,
+            a.level + 1
+        FROM ancestry a
+        INNER JOIN hierarchy h ON h.child_person_id = a.ancestor_person_id
+        WHERE a.level < 100
+    )
+    SELECT COUNT(*) FROM (
+        SELECT DISTINCT ON (person_id) person_id, parent_person_id, ancestor_person_id
+        FROM ancestry
+        ORDER BY person_id, level DESC
+    ) person_hierarchy
+"""
+
+
+def scaled_sizes(tickets: int, people: Optional[int] = None) -> Dict[str, int]:
+    """Row counts per table for a given number of tickets"""
+    plans = max(10, tickets // 100)
+    venues = max(5, plans // 10)
+    cities = max(3, venues // 20)
+    return {
+        'countries': max(2, cities // 10),
+        'city': cities,
+        'venue': venues,
+        'plan': plans,
+        'event': max(plans, tickets // 20),
+        'ticket': tickets,
+        'review': max(1, tickets // 10),
+        'people': tickets if people is None else people,
+    }
+
+
+def skewed_index(rng: random.Random, size: int, skew: float = 1.1) -> 'Iterator[int]':
+    """Endless Zipf-like draws of indexes in [0, size): low indexes are the popular ones"""
+    cum_weights, total = [], 0.0
+    for i in range(size):
+        total += 1.0 / (i + 1) ** skew
+        cum_weights.append(total)
+    population = range(size)
+    while True:
+        yield from rng.choices(population, cum_weights=cum_weights, k=10000)
+
+
+def weighted(rng: random.Random, weights: Dict[str, float]) -> 'Iterator[str]':
+    keys, values = list(weights), list(weights.values())
+    while True:
+        yield from rng.choices(keys, weights=values, k=10000)
+
+
+def person_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_people(rng: random.Random, size: int, max_depth: int,
+                    fan_out: int) -> Tuple[List[Tuple[str]], List[Tuple[str, str]]]:
+    """Forest of `size` people, each tree at most `max_depth` levels deep with ~`fan_out` children per node"""
+    people: List[Tuple[str]] = []
+    edges: List[Tuple[str, str]] = []
+    frontier: List[Tuple[str, int]] = []
+    head = 0
+    while len(people) < size:
+        if head == len(frontier):
+            root = person_uuid(rng)
+            people.append((root,))
+            frontier.append((root, 0))
+        parent, depth = frontier[head]
+        head += 1
+        if depth >= max_depth:
+            continue
+        for _ in range(min(rng.randint(0, 2 * fan_out), size - len(people))):
+            child = person_uuid(rng)
+            people.append((child,))
+            edges.append((parent, child))
+            frontier.append((child, depth + 1))
+    return people, edges
+
+
+def generate_event_model(rng: random.Random, sizes: Dict[str, int]) -> Dict[str, Iterable[Tuple]]:
+    """Row iterators per table for the queries_demo model"""
+    countries = [(i, f'Country {i}') for i in range(sizes['countries'])]
+    cities = [(i, f'City {i}', i % sizes['countries']) for i in range(sizes['city'])]
+    city_draw = skewed_index(rng, sizes['city'])
+    venues = [(i, f'Venue {i}', next(city_draw)) for i in range(sizes['venue'])]
+    categories = [(i, name) for i, name in enumerate(CATEGORIES)]
+    category_children = [(i, i // 3, f'{CATEGORIES[i // 3]} {i % 3}') for i in range(len(CATEGORIES) * 3)]
+
+    venue_draw = skewed_index(rng, sizes['venue'])
+    category_draw = skewed_index(rng, len(CATEGORIES), skew=0.8)
+    status_draw = weighted(rng, PLAN_STATUS_WEIGHTS)
+    plans = [
+        (i, f'Plan {i}', next(category_draw), next(venue_draw),
+         START_DATE + timedelta(days=rng.randrange(DAYS), hours=rng.randrange(10, 23)), next(status_draw))
+        for i in range(sizes['plan'])
+    ]
+    plan_venue = [plan[3] for plan in plans]
+    plan_start = [plan[4] for plan in plans]
+
+    def prices():
+        currency_draw = weighted(rng, CURRENCY_WEIGHTS)
+        price_id = 0
+        for plan_id in range(sizes['plan']):
+            for _ in range(rng.randint(1, 3)):
+                quantity = rng.choice([1, 1, 2, 4, 6])
+                price_type = 'SINGLE' if quantity == 1 else 'MULTIPLE'
+                yield price_id, plan_id, price_type, round(rng.uniform(8, 120) * quantity, 2), quantity, \
+                    next(currency_draw)
+                price_id += 1
+
+    def events():
+        plan_draw = skewed_index(rng, sizes['plan'])
+        for event_id in range(sizes['event']):
+            plan_id = next(plan_draw)
+            yield event_id, plan_id, plan_venue[plan_id]
+
+    def tickets():
+        plan_draw = skewed_index(rng, sizes['plan'])
+        ticket_status = weighted(rng, TICKET_STATUS_WEIGHTS)
+        for ticket_id in range(sizes['ticket']):
+            plan_id = next(plan_draw)
+            created_at = plan_start[plan_id] - timedelta(days=rng.randrange(90), minutes=rng.randrange(1440))
+            yield ticket_id, plan_id, rng.choice([1, 1, 1, 2, 2, 4]), next(ticket_status), created_at
+
+    def reviews():
+        plan_draw = skewed_index(rng, sizes['plan'])
+        review_status = weighted(rng, REVIEW_STATUS_WEIGHTS)
+        for review_id in range(sizes['review']):
+            rating = rng.choices([1, 2, 3, 4, 5], weights=[5, 5, 15, 35, 40])[0]
+            yield review_id, next(plan_draw), rating, f'Rated {rating}', next(review_status)
+
+    return {
+        'countries': countries,
+        'city': cities,
+        'venue': venues,
+        'category_main': categories,
+        'category_child': category_children,
+        'plan': plans,
+        'prices': prices(),
+        'event': events(),
+        'ticket': tickets(),
+        'review': reviews(),
+    }
+
+
+def generate_rates(rng: random.Random) -> Dict[str, Iterable[Tuple]]:
+    """Daily USD-based rates over the plan date range, as a random walk"""
+    now = datetime.now()
+    currencies = [(code, code, True, now) for code in CURRENCY_WEIGHTS]
+
+    def rates():
+        levels = {'EUR': 0.92, 'GBP': 0.79}
+        for day in range(-30, DAYS):
+            rate_date = START_DATE + timedelta(days=day, hours=12)
+            for target, level in levels.items():
+                levels[target] = level * (1 + rng.gauss(0, 0.003))
+                yield rate_date, 'USD', target, round(levels[target], 6), False, now, now
+
+    return {'currencies': currencies, 'exchange_rates': rates()}
+
+
+TABLE_COLUMNS = {
+    'countries': 'country_id, country_name',
+    'city': 'city_id, city_name, country_id',
+    'venue': 'venue_id, venue_name, city_id',
+    'category_main': 'category_main_id, category_name',
+    'category_child': 'category_child_id, category_main_id, category_name',
+    'plan': 'plan_id, plan_name, category_main_id, venue_id, dt_start, status',
+    'prices': 'price_id, plan_id, type, import, quantity, currency',
+    'event': 'event_id, plan_id, venue_id',
+    'ticket': 'ticket_id, plan_id, quantity, status, created_at',
+    'review': 'review_id, plan_id, rating, comment, status',
+    'currencies': 'currency_code, currency_name, is_active, last_updated',
+    'exchange_rates': 'rate_date, source_currency, target_currency, rate, is_live, created_at, updated_at',
+    'people': 'person_id',
+    'hierarchy': 'parent_person_id, child_person_id',
+}
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class RowStream(io.TextIOBase):
+    """File-like view over a row iterator in COPY text format, read lazily by copy_expert"""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        self._lines = ('\t'.join(_copy_value(v) for v in row) + '\n' for row in rows)
+        self._buffer = ''
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+            self.rows += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def copy_rows(raw_conn, table: str, rows: Iterable[Tuple]) -> int:
+    """Bulk-load rows into a table with COPY FROM STDIN"""
+    stream = RowStream(rows)
+    with raw_conn.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({TABLE_COLUMNS[table]}) FROM STDIN", stream, size=1 << 16)
+    raw_conn.commit()
+    return stream.rows
+
+
+class Timings:
+    def __init__(self):
+        self.results: List[Tuple[int, str, float]] = []
+
+    @contextmanager
+    def measure(self, scale: int, label: str):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.results.append((scale, label, elapsed))
+        logger.info(f"[{scale}] {label}: {elapsed:.3f}s")
+
+    def report(self) -> str:
+        scales = sorted({scale for scale, _, _ in self.results})
+        labels = list(dict.fromkeys(label for _, label, _ in self.results))
+        values = {(scale, label): elapsed for scale, label, elapsed in self.results}
+        width = max(len(label) for label in labels) + 2
+        lines = ['step'.ljust(width) + ''.join(f'{scale:>14,}' for scale in scales)]
+        for label in labels:
+            cells = ''.join(
+                f'{values[(scale, label)]:>13.3f}s' if (scale, label) in values else ' ' * 14 for scale in scales)
+            lines.append(label.ljust(width) + cells)
+        return '\n'.join(lines)
+
+
+def run_sql_file(engine, path: str):
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor, open(path, 'r') as file:
+            cursor.execute(file.read())
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+
+def benchmark_scale(engine, timings: Timings, scale: int, args):
+    rng = random.Random(args.seed)
+    sizes = scaled_sizes(scale, args.people)
+    logger.info(f"Scale {scale}: {sizes}")
+
+    run_sql_file(engine, os.path.join(CURRENT_DIR, 'schema.sql'))
+    raw_conn = engine.raw_connection()
+    try:
+        with timings.measure(scale, 'load event model (COPY)'):
+            for table, rows in {**generate_event_model(rng, sizes), **generate_rates(rng)}.items():
+                copy_rows(raw_conn, table, rows)
+        with timings.measure(scale, 'load people forest (COPY)'):
+            people, edges = generate_people(rng, sizes['people'], args.max_depth, args.fan_out)
+            copy_rows(raw_conn, 'people', people)
+            copy_rows(raw_conn, 'hierarchy', edges)
+            del people, edges
+    finally:
+        raw_conn.close()
+
+    with timings.measure(scale, 'indexes + analyze'):
+        run_sql_file(engine, os.path.join(CURRENT_DIR, 'indexes.sql'))
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+    run_sql_file(engine, os.path.join(QUERIES_DIR, 'prices_converted.sql'))
+    run_sql_file(engine, os.path.join(QUERIES_DIR, 'report_summaries.sql'))
+    with engine.begin() as conn:
+        with timings.measure(scale, 'refresh_prices_converted (full)'):
+            conn.execute(text("CALL refresh_prices_converted('USD')"))
+        with timings.measure(scale, 'rebuild_report_summaries (full)'):
+            conn.execute(text("CALL rebuild_report_summaries()"))
+
+    with engine.begin() as conn:
+        max_ticket = conn.execute(text("SELECT COALESCE(MAX(ticket_id), 0) FROM ticket")).scalar()
+        conn.execute(text("""
+            INSERT INTO ticket (ticket_id, plan_id, quantity, status, created_at)
+            SELECT :max_ticket + g, g % 10, 1, 'PAID', TIMESTAMP '2024-06-01'
+            FROM generate_series(1, 1000) g
+        """), {'max_ticket': max_ticket})
+    with engine.begin() as conn:
+        with timings.measure(scale, 'refresh_report_summaries (+1000 tickets, 10 plans)'):
+            conn.execute(text("CALL refresh_report_summaries()"))
+
+    with engine.connect() as conn:
+        for report in REPORTS:
+            query = ReportQuery.load(report, QUERIES_DIR)
+            with timings.measure(scale, f'report {report}'):
+                conn.execute(query.statement, query.bind({})).fetchall()
+
+        if not args.skip_recursive:
+            with timings.measure(scale, 'recursive_demo.sql (postgres port)'):
+                conn.execute(text(RECURSIVE_HIERARCHY_QUERY)).scalar()
+
+    raw_conn = engine.raw_connection()
+    try:
+        with timings.measure(scale, 'hierarchy_engine load + resolve'):
+            graph, _ = load_graph(raw_conn)
+            graph.resolve(args.max_depth)
+    finally:
+        raw_conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate, bulk-load and benchmark synthetic datasets')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Ticket counts to benchmark (other tables are scaled from it)')
+    parser.add_argument('--people', type=int, help='People in the hierarchy forest (default: same as tickets)')
+    parser.add_argument('--max-depth', type=int, default=12, help='Maximum depth of each people tree')
+    parser.add_argument('--fan-out', type=int, default=3, help='Average children per person')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--skip-recursive', action='store_true',
+                        help='Skip the recursive CTE hierarchy query (slow at large scales)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    engine = create_engine(
+        f"postgresql://{os.getenv('POSTGRES_USER', 'postgres')}:{os.getenv('POSTGRES_PASSWORD', 'password')}@"
+        f"{os.getenv('POSTGRES_HOST', 'localhost')}:{os.getenv('POSTGRES_PORT', '5432')}/"
+        f"{os.getenv('POSTGRES_DB', 'benchmark')}"
+    )
+    timings = Timings()
+    for scale in args.scales:
+        benchmark_scale(engine, timings, scale, args)
+    print(timings.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from synthetic_data import RowStream, _copy_value, generate_people, scaled_sizes
+
+
+@pytest.mark.parametrize('size,max_depth,fan_out', [(1, 3, 2), (500, 4, 3), (1000, 1, 5), (300, 0, 2)])
+def test_generate_people_shape(size, max_depth, fan_out):
+    """Exact size, one parent per child and no tree deeper than max_depth"""
+    people, edges = generate_people(random.Random(7), size, max_depth, fan_out)
+
+    ids = [person for person, in people]
+    assert len(ids) == size
+    assert len(set(ids)) == size
+
+    parents = {}
+    for parent, child in edges:
+        assert child not in parents
+        parents[child] = parent
+    assert set(parents) <= set(ids) and set(parents.values()) <= set(ids)
+
+    for person in ids:
+        depth = 0
+        while person in parents:
+            person = parents[person]
+            depth += 1
+        assert depth <= max_depth
+
+def test_generate_people_is_reproducible():
+    assert generate_people(random.Random(1), 50, 3, 2) == generate_people(random.Random(1), 50, 3, 2)
+
+def test_scaled_sizes():
+    """Tables grow from the ticket count with fixed floors for tiny scales"""
+    assert scaled_sizes(100000) == {
+        'countries': 2, 'city': 5, 'venue': 100, 'plan': 1000,
+        'event': 5000, 'ticket': 100000, 'review': 10000, 'people': 100000,
+    }
+    assert scaled_sizes(0) == {
+        'countries': 2, 'city': 3, 'venue': 5, 'plan': 10,
+        'event': 10, 'ticket': 0, 'review': 1, 'people': 0,
+    }
+    assert scaled_sizes(1000, people=42)['people'] == 42
+
+def test_copy_value_escaping():
+    assert _copy_value(None) == '\\N'
+    assert _copy_value('a\tb') == 'a\\tb'
+    assert _copy_value('a\nb') == 'a\\nb'
+    assert _copy_value('C:\\temp') == 'C:\\\\temp'
+    # The backslash is escaped before the escapes it introduces
+    assert _copy_value('\\N') == '\\\\N'
+    assert _copy_value(1.5) == '1.5'
+
+@pytest.mark.parametrize('size', [-1, 1, 7, 1 << 16])
+def test_row_stream_copy_text(size):
+    """Rows come out as COPY text lines whatever the read size"""
+    rows = [(1, 'tab\there', None), (2, 'new\nline', 'back\\slash')]
+    stream = RowStream(rows)
+
+    chunks = []
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if size < 0:
+            break
+
+    assert ''.join(chunks) == '1\ttab\\there\t\\N\n2\tnew\\nline\tback\\\\slash\n'
+    assert stream.rows == 2
@@ -0,0 +1,167 @@
+# src/db/export.py
+import os
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from .watermarks import CLOCK_QUERY, WATERMARK_OVERLAP
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = '_export_state.json'
+
+RATES_SCHEMA = pa.schema([
+    # source_currency is the partition key, encoded in the directory name only
+    ('rate_date', pa.timestamp('us')),
+    ('target_currency', pa.string()),
+    ('rate', pa.decimal128(20, 6)),
+    ('is_live', pa.bool_()),
+    ('created_at', pa.timestamp('us')),
+    ('updated_at', pa.timestamp('us')),
+])
+
+CURRENCIES_SCHEMA = pa.schema([
+    ('currency_code', pa.string()),
+    ('currency_name', pa.string()),
+    ('is_active', pa.bool_()),
+    ('last_updated', pa.timestamp('us')),
+])
+
+CHANGED_PARTITIONS_QUERY = """
+    SELECT DISTINCT to_char(rate_date, 'YYYY-MM') AS month, source_currency
+    FROM exchange_rates
+    WHERE CAST(:since AS timestamp) IS NULL OR updated_at > :since
+"""
+
+PARTITION_QUERY = """
+    SELECT rate_date, target_currency, rate, is_live, created_at, updated_at
+    FROM exchange_rates
+    WHERE rate_date >= :month_start
+    AND rate_date < :month_end
+    AND source_currency = :source_currency
+    ORDER BY rate_date, target_currency
+"""
+
+CURRENCIES_QUERY = """
+    SELECT currency_code, currency_name, is_active, last_updated
+    FROM currencies
+    ORDER BY currency_code
+"""
+
+
+def month_bounds(month: str) -> Tuple[date, date]:
+    """Return [first day, first day of next month) for a YYYY-MM string"""
+    start = datetime.strptime(month, '%Y-%m').date()
+    if start.month == 12:
+        return start, date(start.year + 1, 1, 1)
+    return start, date(start.year, start.month + 1, 1)
+
+
+class ParquetExporter:
+    """
+    Incremental Parquet export of the final layer.
+
+    exchange_rates is written as one file per month=YYYY-MM/source_currency=XXX
+    partition and only partitions holding rows updated since the previous
+    export (minus an overlap window for late commits) are rewritten. Rows are streamed through server-side cursors, so a
+    partition never has to fit in memory.
+    """
+
+    def __init__(self, engine, path: str, batch_size: int = 50000, overlap: timedelta = WATERMARK_OVERLAP):
+        self.engine = engine
+        self.path = path
+        self.batch_size = batch_size
+        self.overlap = overlap
+
+    def _since(self, state: Dict[str, Optional[str]], key: str) -> Optional[datetime]:
+        """Previous watermark of `key` moved back by the overlap window"""
+        if state.get(key) is None:
+            return None
+        return datetime.fromisoformat(state[key]) - self.overlap
+
+    def _read_state(self) -> Dict[str, Optional[str]]:
+        state_path = os.path.join(self.path, STATE_FILE)
+        if not os.path.exists(state_path):
+            return {}
+        with open(state_path, 'r') as file:
+            return json.load(file)
+
+    def _write_state(self, state: Dict[str, Optional[str]]):
+        state_path = os.path.join(self.path, STATE_FILE)
+        tmp_path = f'{state_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, state_path)
+
+    def _partition_path(self, month: str, source_currency: str) -> str:
+        return os.path.join(
+            self.path, 'exchange_rates', f'month={month}', f'source_currency={source_currency}', 'data.parquet')
+
+    def _stream_to_parquet(self, conn, query: str, params: Dict, schema: pa.Schema, file_path: str) -> int:
+        """Stream a query into a Parquet file batch by batch, replacing the file atomically"""
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f'{file_path}.tmp'
+        written = 0
+        result = conn.execution_options(stream_results=True).execute(text(query), params)
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            while True:
+                batch = result.fetchmany(self.batch_size)
+                if not batch:
+                    break
+                columns = list(zip(*batch))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema))
+                written += len(batch)
+
+        if written == 0:
+            # Partition emptied since the last export
+            os.remove(tmp_path)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        else:
+            os.replace(tmp_path, file_path)
+        return written
+
+    def _changed_partitions(self, conn, since: Optional[datetime]) -> List[Tuple[str, str]]:
+        result = conn.execute(text(CHANGED_PARTITIONS_QUERY), {'since': since})
+        return sorted((row.month, row.source_currency) for row in result)
+
+    def export(self) -> Dict[str, int]:
+        """Export changed exchange_rates partitions and, if modified, the currencies table"""
+        os.makedirs(self.path, exist_ok=True)
+        state = self._read_state()
+        stats = {'partitions': 0, 'rate_rows': 0, 'currency_rows': 0}
+
+        with self.engine.connect() as conn:
+            # Watermark is the database clock before reading: anything committed
+            # later is picked up by the next export
+            watermark = conn.execute(text(CLOCK_QUERY)).scalar()
+            for month, source_currency in self._changed_partitions(conn, self._since(state, 'exchange_rates')):
+                month_start, month_end = month_bounds(month)
+                stats['rate_rows'] += self._stream_to_parquet(
+                    conn, PARTITION_QUERY,
+                    {'month_start': month_start, 'month_end': month_end, 'source_currency': source_currency},
+                    RATES_SCHEMA, self._partition_path(month, source_currency))
+                stats['partitions'] += 1
+                logger.info(f"Exported exchange_rates partition {month}/{source_currency}")
+            state['exchange_rates'] = watermark.isoformat()
+
+            currencies_updated = conn.execute(text("SELECT MAX(last_updated) FROM currencies")).scalar()
+            currencies_path = os.path.join(self.path, 'currencies', 'data.parquet')
+            since = self._since(state, 'currencies')
+            if since is None or (currencies_updated is not None and currencies_updated > since) \
+                    or not os.path.exists(currencies_path):
+                stats['currency_rows'] = self._stream_to_parquet(
+                    conn, CURRENCIES_QUERY, {}, CURRENCIES_SCHEMA, currencies_path)
+                logger.info("Exported currencies table")
+            state['currencies'] = watermark.isoformat()
+
+        self._write_state(state)
+        logger.info(f"Export to {self.path} completed: {stats}")
+        return stats
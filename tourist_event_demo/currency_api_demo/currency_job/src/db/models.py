@@ -1,5 +1,5 @@
 # src/db/models.py
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, JSON, Date, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, JSON, Date, ForeignKey, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -49,6 +49,11 @@ class StagingRates(Base):
     processed_at = Column(DateTime)
     source_id = Column(Integer)  # References either raw_live or raw_historical
 
+    __table_args__ = (
+        # raw -> staging skips raw rows already promoted
+        Index('ix_stg_rates_source_id', 'source_id', 'is_live'),
+    )
+
 # FINAL LAYER
 class Currencies(Base):
     __tablename__ = 'currencies'
@@ -71,4 +76,6 @@ class ExchangeRates(Base):
     # Unique constraint for no duplicates
     __table_args__ = (
         UniqueConstraint('rate_date', 'source_currency', 'target_currency'),
+        # Incremental exports look up rows changed since the last watermark
+        Index('ix_exchange_rates_updated_at', 'updated_at'),
     )
\ No newline at end of file
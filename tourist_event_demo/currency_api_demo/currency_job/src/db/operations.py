@@ -1,17 +1,41 @@
 import os
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex
 import logging
 from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from .models import (
     Base, RawCurrencyList, RawLiveRates, RawHistoricalRates,
     StagingCurrencies, StagingRates)
+from .snapshot import RateSnapshot
+from .export import ParquetExporter
+from .retention import RawArchiver
 
 logger = logging.getLogger(__name__)
 
+# Procedures behind each layer step. Procedures in the same stage are
+# independent and run in parallel; stages run in order.
+LAYER_STEPS = {
+    ('raw', 'staging'): [
+        ['process_raw_to_staging_currencies',
+         'process_raw_to_staging_live_rates',
+         'process_raw_to_staging_historical_rates'],
+    ],
+    ('staging', 'final'): [
+        ['process_staging_to_final_currencies'],
+        # exchange_rates references currencies
+        ['process_staging_to_final_rates'],
+    ],
+}
+
+# Transaction-level lock per procedure, so overlapping runs queue up instead of
+# replacing and calling the same procedure at the same time
+ADVISORY_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext('currency_job'), hashtext(:name))")
+
 class DatabaseOperations:
     def __init__(self):
         # Get database connection details from environment variables
@@ -25,7 +49,10 @@ class DatabaseOperations:
         
         self.engine = create_engine(
             f"postgresql://{db_params['user']}:{db_params['password']}@"
-            f"{db_params['host']}:{db_params['port']}/{db_params['database']}"
+            f"{db_params['host']}:{db_params['port']}/{db_params['database']}",
+            # One connection per procedure running in parallel
+            pool_size=int(os.getenv('POSTGRES_POOL_SIZE', '5')),
+            pool_pre_ping=True,
         )
 
     def _read_sql_file(self, filename: str) -> str:
@@ -39,6 +66,9 @@ class DatabaseOperations:
         """Create/Replace & Execute database scripts receiving the procedure name"""
         try:
             with self.engine.begin() as conn:  # Automatically handles commit/rollback insteadw USE self.engine.connect() as conn:
+                # Held until commit/rollback, other runs wait here
+                conn.execute(ADVISORY_LOCK_SQL, {'name': procedure_name})
+
                 # First create/replace the procedure
                 logger.info(f"Creating/replacing procedure: {procedure_name}")
                 sp_sql = self._read_sql_file(f'{procedure_name}.sql')
@@ -53,13 +83,41 @@ class DatabaseOperations:
         except SQLAlchemyError as e:
             logger.error(f"Error creating stored procedures: {str(e)}")
             raise
-    
+
+    def create_database_object(self, procedure_name: str):
+        """Create/Replace a procedure without executing it"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(ADVISORY_LOCK_SQL, {'name': procedure_name})
+                logger.info(f"Creating/replacing procedure: {procedure_name}")
+                conn.execute(text(self._read_sql_file(f'{procedure_name}.sql')))
+        except SQLAlchemyError as e:
+            logger.error(f"Error creating stored procedures: {str(e)}")
+            raise
+
+    def execute_database_objects(self, procedure_names: List[str]):
+        """Execute independent procedures in parallel, each on its own pooled connection"""
+        if len(procedure_names) == 1:
+            self.execute_database_object(procedure_names[0])
+            return
+        with ThreadPoolExecutor(max_workers=len(procedure_names)) as executor:
+            futures = [executor.submit(self.execute_database_object, name) for name in procedure_names]
+            # Raises the first failure once every procedure has finished
+            for future in futures:
+                future.result()
+
     def process_layer_to_layer(self, layer_from: str, layer_to: str):
         """
         Process data from source layer (raw or staging) tables to layer (staging or final) tables using stored procedures.
         """
+        stages = LAYER_STEPS.get((layer_from, layer_to))
+        if stages is None:
+            raise ValueError(f"Unknown layer step: {layer_from} -> {layer_to}")
         try:
-            self.execute_database_object(f'process_{layer_from}_to_{layer_to}')
+            for procedure_names in stages:
+                self.execute_database_objects(procedure_names)
+            # Keep the all-in-one procedure available for manual runs
+            self.create_database_object(f'process_{layer_from}_to_{layer_to}')
             logger.info(f"Successfully processed {layer_from} data to {layer_to} tables")
         except SQLAlchemyError as e:
             logger.error(f"Error processing {layer_from} to {layer_to} tables: {str(e)}")
@@ -68,6 +126,45 @@ class DatabaseOperations:
     def setup_database(self):
         """Setup database procedures - can be called separately when needed"""
         Base.metadata.create_all(self.engine)
+        # create_all skips existing tables, so indexes added to them later are created here
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+
+    def export_rate_snapshot(self, path: str) -> RateSnapshot:
+        """Sync the columnar rate snapshot at `path` with the final layer"""
+        try:
+            snapshot = RateSnapshot(path)
+            snapshot.export_from(self.engine)
+            return snapshot
+        except SQLAlchemyError as e:
+            logger.error(f"Error exporting rate snapshot: {str(e)}")
+            raise
+
+    def export_final_layer(self, path: str) -> Dict[str, int]:
+        """Export final layer partitions changed since the last export to Parquet under `path`"""
+        try:
+            return ParquetExporter(self.engine, path).export()
+        except SQLAlchemyError as e:
+            logger.error(f"Error exporting final layer: {str(e)}")
+            raise
+
+    def archive_raw_layer(self, path: str, retention_days: int) -> Dict[str, int]:
+        """Archive promoted raw rows older than `retention_days` to compressed files under `path`"""
+        try:
+            return RawArchiver(self.engine, path, retention_days).archive()
+        except SQLAlchemyError as e:
+            logger.error(f"Error archiving raw layer: {str(e)}")
+            raise
+
+    def restore_raw_layer(self, path: str, month: Optional[str] = None, reprocess: bool = True) -> Dict[str, int]:
+        """Restore archived raw rows from `path`, optionally only one YYYY-MM month"""
+        try:
+            return RawArchiver(self.engine, path).restore(month, reprocess=reprocess)
+        except SQLAlchemyError as e:
+            logger.error(f"Error restoring raw layer: {str(e)}")
+            raise
 
     def save_raw_currency_list(self, data: Dict[str, Any]) -> None:
         """Save raw currency list data"""
@@ -102,60 +199,58 @@ class DatabaseOperations:
             logger.error(f"Error saving raw live rates: {str(e)}")
             raise
 
-    # src/db/operations.py
-
-def save_raw_historical_rates(self, date: str, source_currency: str, data: Dict[str, Any]) -> None:
-    """Save raw historical rates data"""
-    try:
-        with Session(self.engine) as session:
-            raw_record = RawHistoricalRates(
-                timestamp=datetime.now(),
-                date=datetime.strptime(date, '%Y-%m-%d').date(),
-                source_currency=source_currency,
-                raw_data=data,
-                status='success'
-            )
-            session.add(raw_record)
-            session.commit()
-            logger.info("Successfully saved raw historical rates data")
-    except SQLAlchemyError as e:
-        logger.error(f"Error saving raw historical rates: {str(e)}")
-        raise
-
-def save_staging_currencies(self, currency_data: List[Dict[str, Any]]) -> None:
-    """Save staging currencies data"""
-    try:
-        with Session(self.engine) as session:
-            for data in currency_data:
-                stg_record = StagingCurrencies(
-                    currency_code=data['code'],
-                    currency_name=data['name'],
-                    processed_at=datetime.now()
-                )
-                session.merge(stg_record)
-            session.commit()
-            logger.info("Successfully saved staging currencies data")
-    except SQLAlchemyError as e:
-        logger.error(f"Error saving staging currencies: {str(e)}")
-        raise
-
-def save_staging_rates(self, rates_data: List[Dict[str, Any]]) -> None:
-    """Save staging rates data"""
-    try:
-        with Session(self.engine) as session:
-            for data in rates_data:
-                stg_record = StagingRates(
-                    rate_date=data['date'],
-                    source_currency=data['source'],
-                    target_currency=data['target'],
-                    rate=data['rate'],
-                    is_live=data.get('is_live', False),
-                    processed_at=datetime.now(),
-                    source_id=data.get('source_id')
+    def save_raw_historical_rates(self, date: str, source_currency: str, data: Dict[str, Any]) -> None:
+        """Save raw historical rates data"""
+        try:
+            with Session(self.engine) as session:
+                raw_record = RawHistoricalRates(
+                    timestamp=datetime.now(),
+                    date=datetime.strptime(date, '%Y-%m-%d').date(),
+                    source_currency=source_currency,
+                    raw_data=data,
+                    status='success'
                 )
-                session.merge(stg_record)
-            session.commit()
-            logger.info("Successfully saved staging rates data")
-    except SQLAlchemyError as e:
-        logger.error(f"Error saving staging rates: {str(e)}")
-        raise
\ No newline at end of file
+                session.add(raw_record)
+                session.commit()
+                logger.info("Successfully saved raw historical rates data")
+        except SQLAlchemyError as e:
+            logger.error(f"Error saving raw historical rates: {str(e)}")
+            raise
+
+    def save_staging_currencies(self, currency_data: List[Dict[str, Any]]) -> None:
+        """Save staging currencies data"""
+        try:
+            with Session(self.engine) as session:
+                for data in currency_data:
+                    stg_record = StagingCurrencies(
+                        currency_code=data['code'],
+                        currency_name=data['name'],
+                        processed_at=datetime.now()
+                    )
+                    session.merge(stg_record)
+                session.commit()
+                logger.info("Successfully saved staging currencies data")
+        except SQLAlchemyError as e:
+            logger.error(f"Error saving staging currencies: {str(e)}")
+            raise
+
+    def save_staging_rates(self, rates_data: List[Dict[str, Any]]) -> None:
+        """Save staging rates data"""
+        try:
+            with Session(self.engine) as session:
+                for data in rates_data:
+                    stg_record = StagingRates(
+                        rate_date=data['date'],
+                        source_currency=data['source'],
+                        target_currency=data['target'],
+                        rate=data['rate'],
+                        is_live=data.get('is_live', False),
+                        processed_at=datetime.now(),
+                        source_id=data.get('source_id')
+                    )
+                    session.merge(stg_record)
+                session.commit()
+                logger.info("Successfully saved staging rates data")
+        except SQLAlchemyError as e:
+            logger.error(f"Error saving staging rates: {str(e)}")
+            raise
\ No newline at end of file
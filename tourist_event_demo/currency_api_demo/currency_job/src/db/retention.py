@@ -0,0 +1,189 @@
+# src/db/retention.py
+import os
+import glob
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import text
+
+from .models import RawCurrencyList, RawLiveRates, RawHistoricalRates
+
+logger = logging.getLogger(__name__)
+
+# Raw rows that are safe to archive: already promoted to staging
+PROMOTED_RULES = {
+    # stg_currencies.source_id references raw_currency_list, so referenced lists stay;
+    # older unreferenced lists were superseded by a promoted one
+    RawCurrencyList.__tablename__: """
+        NOT EXISTS (SELECT 1 FROM stg_currencies sc WHERE sc.source_id = r.id)
+        AND r.id < (SELECT COALESCE(MAX(source_id), 0) FROM stg_currencies)
+    """,
+    RawLiveRates.__tablename__: """
+        EXISTS (SELECT 1 FROM stg_rates sr WHERE sr.source_id = r.id AND sr.is_live)
+    """,
+    RawHistoricalRates.__tablename__: """
+        EXISTS (SELECT 1 FROM stg_rates sr WHERE sr.source_id = r.id AND NOT sr.is_live)
+    """,
+}
+
+# Staging rows built from restored raw rows; deleting them lets raw -> staging promote
+# the rows again. Archived currency lists are never referenced by stg_currencies.
+STAGING_ROWS_SQL = {
+    RawLiveRates.__tablename__: "DELETE FROM stg_rates WHERE source_id = ANY(:ids) AND is_live",
+    RawHistoricalRates.__tablename__: "DELETE FROM stg_rates WHERE source_id = ANY(:ids) AND NOT is_live",
+}
+
+RAW_COLUMNS = {
+    model.__tablename__: list(model.__table__.columns.keys())
+    for model in (RawCurrencyList, RawLiveRates, RawHistoricalRates)
+}
+
+# Only one archiver at a time; a second run skips instead of writing the same files
+ARCHIVE_LOCK_SQL = text("SELECT pg_try_advisory_xact_lock(hashtext('currency_job'), hashtext('archive_raw'))")
+
+
+def archive_file_path(path: str, table: str, month: str, first_id: int, last_id: int) -> str:
+    return os.path.join(path, table, f'month={month}', f'part-{first_id:012d}-{last_id:012d}.jsonl.gz')
+
+
+def write_archive(file_path: str, rows: Iterable[Dict]) -> int:
+    """Write rows as gzipped JSON lines, replacing the file atomically"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f'{file_path}.tmp'
+    written = 0
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(row, default=str) + '\n')
+            written += 1
+    os.replace(tmp_path, file_path)
+    return written
+
+
+def read_archive(file_path: str) -> Iterator[Dict]:
+    with gzip.open(file_path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def archive_files(path: str, table: str, month: Optional[str] = None) -> List[str]:
+    pattern = os.path.join(path, table, f'month={month or "*"}', 'part-*.jsonl.gz')
+    return sorted(glob.glob(pattern))
+
+
+class RawArchiver:
+    """
+    Retention for the append-only raw layer.
+
+    Raw rows older than `retention_days` that were already promoted to staging
+    are moved to gzipped JSON lines files, one per table and month
+    (<table>/month=YYYY-MM/part-<first id>-<last id>.jsonl.gz), and deleted from
+    the hot tables. raw_data is kept as the original JSON text and restore()
+    puts rows back under their original ids for reprocessing.
+    """
+
+    def __init__(self, engine, path: str, retention_days: int = 90, batch_size: int = 10000):
+        self.engine = engine
+        self.path = path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+    def _select_columns(self, table: str) -> str:
+        return ', '.join(
+            'r.raw_data::text AS raw_data' if column == 'raw_data' else f'r."{column}"'
+            for column in RAW_COLUMNS[table])
+
+    def _archivable_months(self, conn, table: str, cutoff: datetime) -> List[str]:
+        result = conn.execute(text(f"""
+            SELECT DISTINCT to_char(r."timestamp", 'YYYY-MM') AS month
+            FROM {table} r
+            WHERE r."timestamp" < :cutoff
+            AND {PROMOTED_RULES[table]}
+        """), {'cutoff': cutoff})
+        return sorted(row.month for row in result)
+
+    def _archive_month(self, conn, table: str, month: str, cutoff: datetime) -> int:
+        """Archive one month of a table and delete the archived rows"""
+        rows = [dict(row._mapping) for row in conn.execute(text(f"""
+            SELECT {self._select_columns(table)}
+            FROM {table} r
+            WHERE r."timestamp" < :cutoff
+            AND to_char(r."timestamp", 'YYYY-MM') = :month
+            AND {PROMOTED_RULES[table]}
+            ORDER BY r.id
+        """), {'cutoff': cutoff, 'month': month})]
+        if not rows:
+            return 0
+
+        file_path = archive_file_path(self.path, table, month, rows[0]['id'], rows[-1]['id'])
+        write_archive(file_path, rows)
+        ids = [row['id'] for row in rows]
+        for start in range(0, len(ids), self.batch_size):
+            conn.execute(text(f"DELETE FROM {table} WHERE id = ANY(:ids)"),
+                         {'ids': ids[start:start + self.batch_size]})
+        logger.info(f"Archived {len(rows)} {table} rows of {month} to {file_path}")
+        return len(rows)
+
+    def _vacuum(self, tables: List[str]):
+        """Make the space of deleted rows reusable and refresh planner statistics"""
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for table in tables:
+                logger.info(f"Vacuuming {table}")
+                conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+    def archive(self, vacuum: bool = True) -> Dict[str, int]:
+        """Archive promoted raw rows older than the retention period"""
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        stats = {table: 0 for table in PROMOTED_RULES}
+
+        with self.engine.connect() as conn:
+            months = {table: self._archivable_months(conn, table, cutoff) for table in PROMOTED_RULES}
+
+        for table, table_months in months.items():
+            for month in table_months:
+                # One transaction per file: rows are only deleted once their file is written
+                with self.engine.begin() as conn:
+                    if not conn.execute(ARCHIVE_LOCK_SQL).scalar():
+                        logger.warning("Another raw archive run is in progress, skipping")
+                        return stats
+                    stats[table] += self._archive_month(conn, table, month, cutoff)
+
+        if vacuum:
+            self._vacuum([table for table, archived in stats.items() if archived])
+        logger.info(f"Raw archive older than {cutoff:%Y-%m-%d} completed: {stats}")
+        return stats
+
+    def restore(self, month: Optional[str] = None, tables: Optional[List[str]] = None,
+                reprocess: bool = True) -> Dict[str, int]:
+        """
+        Put archived rows back into the raw tables under their original ids.
+
+        With `reprocess` the staging rows of the restored ids are deleted in the
+        same transaction, so the next raw -> staging run promotes them again.
+        Restored files are removed; rows that are still promoted get archived
+        again by the next archive run.
+        """
+        stats = {}
+        for table in tables or list(PROMOTED_RULES):
+            columns = RAW_COLUMNS[table]
+            insert = text(f"""
+                INSERT INTO {table} ({', '.join(f'"{column}"' for column in columns)})
+                VALUES ({', '.join(f':{column}' for column in columns)})
+                ON CONFLICT (id) DO NOTHING
+            """)
+            stats[table] = 0
+            for file_path in archive_files(self.path, table, month):
+                rows = list(read_archive(file_path))
+                with self.engine.begin() as conn:
+                    for start in range(0, len(rows), self.batch_size):
+                        batch = rows[start:start + self.batch_size]
+                        conn.execute(insert, batch)
+                        if reprocess and table in STAGING_ROWS_SQL:
+                            conn.execute(text(STAGING_ROWS_SQL[table]), {'ids': [row['id'] for row in batch]})
+                os.remove(file_path)
+                stats[table] += len(rows)
+                logger.info(f"Restored {len(rows)} {table} rows from {file_path}")
+        logger.info(f"Raw restore completed: {stats}")
+        return stats
@@ -0,0 +1,260 @@
+# src/db/snapshot.py
+import os
+import glob
+import copy
+import json
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from .watermarks import CLOCK_QUERY, WATERMARK_OVERLAP
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+
+# One flat binary file per column, all row-aligned and sorted by day.
+# Each sync writes a new generation of files; meta.json names the live one and
+# the generation it replaced is kept until the next sync for readers still on it.
+COLUMNS = {
+    'days': np.int32,     # day offset from EPOCH
+    'pairs': np.int16,    # index into meta['pairs'] (e.g. 'USDEUR')
+    'rates': np.float64,
+}
+
+SNAPSHOT_QUERY = """
+    SELECT DISTINCT ON (rate_date::date, source_currency, target_currency)
+        (rate_date::date - DATE '1970-01-01') AS day_offset,
+        source_currency,
+        target_currency,
+        rate::float8 AS rate
+    FROM exchange_rates
+    WHERE rate_date >= :since
+    ORDER BY rate_date::date, source_currency, target_currency, rate_date DESC
+"""
+
+# Earliest rate changed since the previous sync (backfills, corrected rates)
+CHANGED_SINCE_QUERY = """
+    SELECT MIN(rate_date)
+    FROM exchange_rates
+    WHERE updated_at > :since
+"""
+
+
+def to_day_offset(value) -> int:
+    """Convert a date, datetime or YYYY-MM-DD string into a day offset from EPOCH"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+class RateSnapshot:
+    """
+    Columnar on-disk snapshot of the exchange_rates final layer.
+
+    Keeps the last rate of each (day, source, target) as three row-aligned
+    arrays that are memory-mapped read-only, so loading years of history does
+    not go through SQLAlchemy row by row. Columns are mapped on open: a reader
+    keeps its generation even after later syncs delete the files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta = self._read_meta()
+        self._pair_index = {pair: code for code, pair in enumerate(self.meta['pairs'])}
+        self._columns: Optional[Dict[str, np.ndarray]] = self._map_columns()
+
+    def _column_path(self, name: str, generation: Optional[int] = None) -> str:
+        if generation is None:
+            generation = self.meta.get('generation', 0)
+        return os.path.join(self.path, f'{name}.{generation}.bin')
+
+    def _read_meta(self) -> Dict:
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return {'epoch': EPOCH.isoformat(), 'pairs': [], 'rows': 0, 'generation': 0, 'synced_at': None}
+        with open(meta_path, 'r') as file:
+            return json.load(file)
+
+    def _write_meta(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        tmp_path = f'{meta_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.meta, file)
+        os.replace(tmp_path, meta_path)
+
+    @property
+    def rows(self) -> int:
+        return self.meta['rows']
+
+    def _map_columns(self) -> Dict[str, np.ndarray]:
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                # meta rows is authoritative: files of a generation never shrink
+                columns[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(self.rows,))
+        return columns
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Zero-copy, read-only views of the snapshot columns"""
+        if self._columns is None:
+            self._columns = self._map_columns()
+        return self._columns
+
+    @property
+    def last_day(self) -> Optional[int]:
+        if self.rows == 0:
+            return None
+        return int(self.columns['days'][-1])
+
+    def pair_code(self, source_currency: str, target_currency: str) -> Optional[int]:
+        return self._pair_index.get(f'{source_currency}{target_currency}')
+
+    def series(self, source_currency: str, target_currency: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (dates, rates) for one currency pair ordered by date"""
+        code = self.pair_code(source_currency, target_currency)
+        if code is None:
+            return np.empty(0, dtype='datetime64[D]'), np.empty(0, dtype=np.float64)
+        mask = self.columns['pairs'] == code
+        dates = self.columns['days'][mask].astype('datetime64[D]')
+        return dates, self.columns['rates'][mask]
+
+    def rates_on(self, day) -> Dict[str, float]:
+        """Return every pair's rate for a single day"""
+        start, end = self._day_bounds(to_day_offset(day))
+        pairs = self.meta['pairs']
+        return {
+            pairs[code]: float(rate)
+            for code, rate in zip(self.columns['pairs'][start:end], self.columns['rates'][start:end])
+        }
+
+    def _day_bounds(self, day_offset: int) -> Tuple[int, int]:
+        days = self.columns['days']
+        start = int(np.searchsorted(days, day_offset, side='left'))
+        end = int(np.searchsorted(days, day_offset, side='right'))
+        return start, end
+
+    def _encode_pairs(self, sources: List[str], targets: List[str]) -> np.ndarray:
+        codes = np.empty(len(sources), dtype=COLUMNS['pairs'])
+        for i, pair in enumerate(s + t for s, t in zip(sources, targets)):
+            code = self._pair_index.get(pair)
+            if code is None:
+                code = len(self.meta['pairs'])
+                if code > np.iinfo(COLUMNS['pairs']).max:
+                    raise ValueError("Too many currency pairs for the snapshot pair code type")
+                self.meta['pairs'].append(pair)
+                self._pair_index[pair] = code
+            codes[i] = code
+        return codes
+
+    def _start_generation(self, keep: int):
+        """Start a new generation of column files holding the first `keep` rows of the current one"""
+        generation = self.meta.get('generation', 0) + 1
+        for name, dtype in COLUMNS.items():
+            size = keep * np.dtype(dtype).itemsize
+            with open(self._column_path(name, generation), 'wb') as target:
+                if size:
+                    with open(self._column_path(name), 'rb') as source:
+                        while size > 0:
+                            chunk = source.read(min(size, 1 << 20))
+                            if not chunk:
+                                raise ValueError(f"Snapshot column {name} is shorter than meta rows")
+                            target.write(chunk)
+                            size -= len(chunk)
+        self._columns = None
+        self.meta['generation'] = generation
+        self.meta['rows'] = keep
+
+    def _remove_generations(self, keep: Iterable[int]):
+        """Delete column files of every generation not in `keep`; open maps of them stay valid"""
+        keep_paths = {self._column_path(name, generation) for name in COLUMNS for generation in keep}
+        for name in COLUMNS:
+            for file_path in glob.glob(os.path.join(self.path, f'{name}.*.bin')):
+                if file_path not in keep_paths:
+                    os.remove(file_path)
+
+    def append(self, batch: List[Tuple[int, str, str, float]]):
+        """Append rows (day_offset, source, target, rate) sorted by day_offset"""
+        if not batch:
+            return
+        days, sources, targets, rates = zip(*batch)
+        arrays = {
+            'days': np.asarray(days, dtype=COLUMNS['days']),
+            'pairs': self._encode_pairs(sources, targets),
+            'rates': np.asarray(rates, dtype=COLUMNS['rates']),
+        }
+        if self.rows and arrays['days'][0] < self.last_day:
+            raise ValueError("Snapshot rows must be appended in day order")
+        self._columns = None
+        for name, array in arrays.items():
+            with open(self._column_path(name), 'ab') as file:
+                array.tofile(file)
+        self.meta['rows'] += len(batch)
+
+    def _resync_from(self, conn) -> Optional[int]:
+        """First day to rewrite: the last stored day or the earliest day changed since the last sync"""
+        last_day = self.last_day
+        if last_day is None or self.meta.get('synced_at') is None:
+            # Nothing stored or no watermark to compare against: rebuild
+            return None
+        changed = conn.execute(text(CHANGED_SINCE_QUERY), {
+            'since': datetime.fromisoformat(self.meta['synced_at']) - WATERMARK_OVERLAP}).scalar()
+        if changed is None:
+            return last_day
+        return min(last_day, to_day_offset(changed))
+
+    def export_from(self, engine, batch_size: int = 50000) -> int:
+        """
+        Incrementally sync the snapshot with exchange_rates.
+
+        Rows from the earliest day changed since the previous sync (at least
+        the last stored day, as live rates keep arriving during the day) are
+        re-read and the rest is kept. The result goes to a new generation of
+        column files published by an atomic meta.json replace, so readers and
+        failed syncs never see a half-written snapshot.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        previous = copy.deepcopy(self.meta)
+        try:
+            with engine.connect() as conn:
+                synced_at = conn.execute(text(CLOCK_QUERY)).scalar()
+                from_day = self._resync_from(conn)
+                keep = self._day_bounds(from_day)[0] if from_day is not None else 0
+                since = EPOCH if from_day is None else date.fromordinal(EPOCH.toordinal() + from_day)
+                self._start_generation(keep)
+
+                written = 0
+                result = conn.execution_options(stream_results=True).execute(
+                    text(SNAPSHOT_QUERY), {'since': since})
+                while True:
+                    batch = result.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    self.append([tuple(row) for row in batch])
+                    written += len(batch)
+        except Exception:
+            # Drop the unpublished generation and keep serving the previous one
+            failed = self.meta.get('generation', 0)
+            self.meta = previous
+            self._pair_index = {pair: code for code, pair in enumerate(self.meta['pairs'])}
+            self._columns = None
+            if failed != previous.get('generation', 0):
+                for name in COLUMNS:
+                    if os.path.exists(self._column_path(name, failed)):
+                        os.remove(self._column_path(name, failed))
+            raise
+
+        self.meta['synced_at'] = synced_at.isoformat()
+        self._write_meta()
+        # Readers that read meta.json just before the publish may still be mapping the previous generation
+        self._remove_generations([previous.get('generation', 0), self.meta['generation']])
+        logger.info(f"Snapshot at {self.path} synced from {since}: {written} rows written, {self.rows} total")
+        return written
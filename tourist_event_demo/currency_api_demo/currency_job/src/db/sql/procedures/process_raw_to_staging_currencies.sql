@@ -0,0 +1,51 @@
+CREATE OR REPLACE PROCEDURE process_raw_to_staging_currencies()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_raw_count INTEGER;
+    v_stg_count INTEGER;
+BEGIN
+    -- Log initial counts
+    SELECT COUNT(*) INTO v_raw_count FROM raw_currency_list;
+    RAISE NOTICE 'Initial raw_currency_list count: %', v_raw_count;
+
+    WITH latest_currencies AS (
+        SELECT DISTINCT ON (curr.currency_code)
+            curr.currency_code,
+            curr.currency as currency_name,
+            rcl.id as source_id
+        FROM raw_currency_list rcl,
+             json_each(rcl.raw_data) as curr(currency_code, currency)
+        WHERE curr.currency_code IS NOT NULL 
+        AND curr.currency IS NOT NULL
+        ORDER BY curr.currency_code, rcl.id DESC
+    )
+    INSERT INTO stg_currencies (
+        currency_code,
+        currency_name,
+        processed_at,
+        source_id
+    )
+    SELECT 
+        currency_code,
+        currency_name,
+        CURRENT_TIMESTAMP as processed_at,
+        source_id
+    FROM latest_currencies
+    ON CONFLICT (currency_code) 
+    DO UPDATE SET
+        currency_name = EXCLUDED.currency_name,
+        processed_at = EXCLUDED.processed_at,
+        source_id = EXCLUDED.source_id; 
+    
+    GET DIAGNOSTICS v_stg_count = ROW_COUNT;
+    RAISE NOTICE 'Inserted % rows into stg_currencies', v_stg_count;
+
+    SELECT COUNT(*) INTO v_stg_count FROM stg_currencies;
+    RAISE NOTICE 'Final stg_currencies count: %', v_stg_count;
+EXCEPTION WHEN OTHERS THEN
+
+    RAISE NOTICE 'Error in process_raw_to_staging_currencies: %', SQLERRM;
+    RAISE;
+END;
+$$;
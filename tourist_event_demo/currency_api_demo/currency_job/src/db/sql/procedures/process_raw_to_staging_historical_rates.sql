@@ -0,0 +1,66 @@
+CREATE OR REPLACE PROCEDURE process_raw_to_staging_historical_rates()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_raw_count INTEGER;
+    v_stg_count INTEGER;
+BEGIN
+    -- Log initial counts
+    SELECT COUNT(*) INTO v_raw_count FROM raw_historical_rates;
+    RAISE NOTICE 'Initial raw_historical_rates count: %', v_raw_count;
+
+    WITH historical_quotes AS (
+        -- historical responses: one day, quotes = {"USDEUR": 0.9, ...}
+        SELECT
+            rhr.id,
+            COALESCE(rhr.raw_data->>'date', rhr.date::text)::date as rate_date,
+            COALESCE(rhr.raw_data->>'source', rhr.source_currency) as source_currency,
+            (rhr.raw_data->>'quotes')::jsonb as quotes
+        FROM raw_historical_rates rhr
+        WHERE NOT COALESCE((rhr.raw_data->>'timeframe')::boolean, false)
+        UNION ALL
+        -- timeframe responses: quotes = {"2024-01-01": {"USDEUR": 0.9, ...}, ...}
+        SELECT
+            rhr.id,
+            quote_day.key::date,
+            COALESCE(rhr.raw_data->>'source', rhr.source_currency),
+            quote_day.value
+        FROM raw_historical_rates rhr,
+             jsonb_each((rhr.raw_data->>'quotes')::jsonb) as quote_day
+        WHERE COALESCE((rhr.raw_data->>'timeframe')::boolean, false)
+    )
+    INSERT INTO stg_rates (
+        rate_date,
+        source_currency,
+        target_currency,
+        rate,
+        is_live,
+        processed_at,
+        source_id
+    )
+    SELECT 
+        hq.rate_date::timestamp as rate_date,
+        hq.source_currency,
+        SUBSTRING(rate_pair.key, 4, 3) as target_currency,
+        rate_pair.value::numeric(20,6) as rate,
+        false as is_live,
+        CURRENT_TIMESTAMP,
+        hq.id
+    FROM historical_quotes hq,
+         jsonb_each(hq.quotes) as rate_pair
+    WHERE jsonb_typeof(rate_pair.value) = 'number'
+    AND NOT EXISTS (
+        SELECT 1 
+        FROM stg_rates sr 
+        WHERE sr.source_id = hq.id
+        AND NOT sr.is_live
+    );
+    
+    GET DIAGNOSTICS v_stg_count = ROW_COUNT;
+    RAISE NOTICE 'Inserted % historical rows into stg_rates', v_stg_count;
+EXCEPTION WHEN OTHERS THEN
+
+    RAISE NOTICE 'Error in process_raw_to_staging_historical_rates: %', SQLERRM;
+    RAISE;
+END;
+$$;
@@ -0,0 +1,46 @@
+CREATE OR REPLACE PROCEDURE process_raw_to_staging_live_rates()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_raw_count INTEGER;
+    v_stg_count INTEGER;
+BEGIN
+    -- Log initial counts
+    SELECT COUNT(*) INTO v_raw_count FROM raw_live_rates;
+    RAISE NOTICE 'Initial raw_live_rates count: %', v_raw_count;
+
+    INSERT INTO stg_rates (
+        rate_date,
+        source_currency,
+        target_currency,
+        rate,
+        is_live,
+        processed_at,
+        source_id
+    )
+    SELECT 
+        to_timestamp((raw_data->>'timestamp')::bigint) as rate_date,
+        raw_data->>'source' as source_currency,
+        SUBSTRING(rate_pair.key, 4, 3) as target_currency,
+        rate_pair.value::numeric(20,6) as rate,
+        true as is_live,
+        CURRENT_TIMESTAMP,
+        rlr.id
+    FROM raw_live_rates rlr,
+         jsonb_each((raw_data->>'quotes')::jsonb) as rate_pair
+    -- source_id points at raw_live_rates or raw_historical_rates, is_live tells them apart
+    WHERE NOT EXISTS (
+        SELECT 1 
+        FROM stg_rates sr 
+        WHERE sr.source_id = rlr.id
+        AND sr.is_live
+    );
+    
+    GET DIAGNOSTICS v_stg_count = ROW_COUNT;
+    RAISE NOTICE 'Inserted % live rows into stg_rates', v_stg_count;
+EXCEPTION WHEN OTHERS THEN
+
+    RAISE NOTICE 'Error in process_raw_to_staging_live_rates: %', SQLERRM;
+    RAISE;
+END;
+$$;
@@ -0,0 +1,38 @@
+CREATE OR REPLACE PROCEDURE process_staging_to_final_currencies()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_final_count INTEGER;
+BEGIN
+
+    INSERT INTO currencies (
+        currency_code, 
+        currency_name, 
+        is_active, 
+        last_updated)
+    SELECT 
+        currency_code,
+        currency_name,
+        true as is_active,
+        CURRENT_TIMESTAMP as last_updated
+    FROM stg_currencies
+    WHERE currency_code IS NOT NULL
+    AND currency_name IS NOT NULL
+    ON CONFLICT (currency_code) 
+    DO UPDATE SET 
+        currency_name = EXCLUDED.currency_name,
+        last_updated = CURRENT_TIMESTAMP
+    -- Only touch rows that really changed so last_updated can drive incremental exports
+    WHERE currencies.currency_name IS DISTINCT FROM EXCLUDED.currency_name;
+
+    GET DIAGNOSTICS v_final_count = ROW_COUNT;
+    RAISE NOTICE 'Processed % rows in currencies table', v_final_count;
+
+    SELECT COUNT(*) INTO v_final_count FROM currencies;
+    RAISE NOTICE 'Final currencies count: %', v_final_count;
+EXCEPTION WHEN OTHERS THEN
+
+    RAISE NOTICE 'Error in process_staging_to_final_currencies: %', SQLERRM;
+    RAISE;
+END;
+$$;
@@ -0,0 +1,57 @@
+CREATE OR REPLACE PROCEDURE process_staging_to_final_rates()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_final_count INTEGER;
+BEGIN
+
+    INSERT INTO exchange_rates (
+        rate_date, 
+        source_currency, 
+        target_currency, 
+        rate, 
+        is_live, 
+        created_at, 
+        updated_at
+    )
+    SELECT 
+        rate_date,
+        source_currency,
+        target_currency,
+        rate,
+        is_live,
+        CURRENT_TIMESTAMP,
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT 
+            rate_date,
+            source_currency,
+            target_currency,
+            rate,
+            is_live,
+            ROW_NUMBER() OVER (PARTITION BY rate_date, source_currency, target_currency ORDER BY processed_at DESC) as rn
+        FROM stg_rates
+    ) subquery_stg_rates
+    WHERE rn = 1
+    -- Rates for codes not promoted to currencies yet (e.g. staged by a run that started
+    -- after the currencies step) stay in staging until the next run instead of breaking the FK
+    AND EXISTS (SELECT 1 FROM currencies c WHERE c.currency_code = subquery_stg_rates.source_currency)
+    AND EXISTS (SELECT 1 FROM currencies c WHERE c.currency_code = subquery_stg_rates.target_currency)
+    ON CONFLICT (rate_date, source_currency, target_currency) 
+    DO UPDATE SET 
+        rate = EXCLUDED.rate,
+        updated_at = CURRENT_TIMESTAMP
+    -- Only touch rows that really changed so updated_at can drive incremental exports
+    WHERE exchange_rates.rate IS DISTINCT FROM EXCLUDED.rate;
+
+    GET DIAGNOSTICS v_final_count = ROW_COUNT;
+    RAISE NOTICE 'Processed % rows in exchange_rates table', v_final_count;
+
+    SELECT COUNT(*) INTO v_final_count FROM exchange_rates;
+    RAISE NOTICE 'Final exchange_rates count: %', v_final_count;
+EXCEPTION WHEN OTHERS THEN
+
+    RAISE NOTICE 'Error in process_staging_to_final_rates: %', SQLERRM;
+    RAISE;
+END;
+$$;
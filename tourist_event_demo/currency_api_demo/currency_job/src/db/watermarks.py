@@ -0,0 +1,11 @@
+# src/db/watermarks.py
+from datetime import timedelta
+
+# Watermarks are the database clock read at the start of a run
+CLOCK_QUERY = "SELECT LOCALTIMESTAMP"
+
+# updated_at/last_updated are stamped with the writing transaction's start time,
+# which can be well before its commit (e.g. while waiting on a layer advisory
+# lock). Each run re-scans this window before the previous watermark so rows
+# committed late with an older timestamp are not missed.
+WATERMARK_OVERLAP = timedelta(hours=1)
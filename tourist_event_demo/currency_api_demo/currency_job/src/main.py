@@ -19,6 +19,22 @@ def parse_args():
     parser.add_argument('--source', type=str, default='USD', help='Source currency code')
     parser.add_argument('--currencies', type=str, nargs='+', help='List of target currencies')
     parser.add_argument('--historical-date', type=str, help='Historical date in YYYY-MM-DD format')
+    parser.add_argument('--snapshot', action='store_true', help='Sync the columnar rate snapshot from the final layer')
+    parser.add_argument('--snapshot-dir', type=str, default=os.getenv('SNAPSHOT_DIR', 'snapshots/exchange_rates'),
+                        help='Directory of the columnar rate snapshot')
+    parser.add_argument('--export', action='store_true', help='Export the final layer to Parquet incrementally')
+    parser.add_argument('--export-dir', type=str, default=os.getenv('EXPORT_DIR', 'export'),
+                        help='Root directory of the Parquet export')
+    parser.add_argument('--archive-raw', action='store_true',
+                        help='Archive promoted raw rows older than --retention-days and delete them')
+    parser.add_argument('--retention-days', type=int, default=int(os.getenv('RAW_RETENTION_DAYS', '90')),
+                        help='Days raw rows stay in the raw tables')
+    parser.add_argument('--archive-dir', type=str, default=os.getenv('ARCHIVE_DIR', 'archive'),
+                        help='Root directory of the raw archive')
+    parser.add_argument('--restore-raw', action='store_true', help='Restore archived raw rows for reprocessing')
+    parser.add_argument('--restore-month', type=str, help='Only restore this month, in YYYY-MM format')
+    parser.add_argument('--restore-keep-staging', action='store_true',
+                        help='Keep the staging rows of restored raw rows instead of reprocessing them')
     return parser.parse_args()
 
 def initialize_services():
@@ -43,6 +59,31 @@ def fetch_currency_list(api: CurrencyAPI, db: DatabaseOperations):
     db.save_raw_currency_list(currencies_data)
     logger.info("Currency list saved to raw layer")
 
+def export_snapshot(db: DatabaseOperations, args):
+    """Sync the columnar rate snapshot with the final layer"""
+    logger.info(f"Syncing rate snapshot at {args.snapshot_dir}")
+    snapshot = db.export_rate_snapshot(args.snapshot_dir)
+    logger.info(f"Rate snapshot holds {snapshot.rows} rows")
+
+def export_final_layer(db: DatabaseOperations, args):
+    """Export changed final layer partitions to Parquet"""
+    logger.info(f"Exporting final layer to {args.export_dir}")
+    stats = db.export_final_layer(args.export_dir)
+    logger.info(f"Exported {stats['partitions']} exchange_rates partitions")
+
+def archive_raw_layer(db: DatabaseOperations, args):
+    """Move promoted raw rows past the retention period to the archive"""
+    logger.info(f"Archiving raw rows older than {args.retention_days} days to {args.archive_dir}")
+    stats = db.archive_raw_layer(args.archive_dir, args.retention_days)
+    logger.info(f"Archived raw rows: {stats}")
+
+def restore_raw_layer(db: DatabaseOperations, args):
+    """Restore archived raw rows so they can be reprocessed"""
+    logger.info(f"Restoring raw rows from {args.archive_dir}")
+    stats = db.restore_raw_layer(args.archive_dir, month=args.restore_month,
+                                 reprocess=not args.restore_keep_staging)
+    logger.info(f"Restored raw rows: {stats}")
+
 def process_timeframe_data(api: CurrencyAPI, db: DatabaseOperations, args):
     """Process timeframe data"""
     if args.start_date is None:
@@ -103,6 +144,25 @@ def main():
             setup_database(db)
             return
 
+        # Only sync the snapshot if requested
+        if args.snapshot:
+            export_snapshot(db, args)
+            return
+
+        # Only export the final layer if requested
+        if args.export:
+            export_final_layer(db, args)
+            return
+
+        # Only run raw retention if requested
+        if args.archive_raw:
+            archive_raw_layer(db, args)
+            return
+
+        if args.restore_raw:
+            restore_raw_layer(db, args)
+            return
+
         # Fetch and save currency list
         fetch_currency_list(api, db)
         
@@ -118,8 +178,9 @@ def main():
 
         # Process through layers
         # Process data through raw -> staging -> final layers
-        # First processes raw data into staging tables using process_raw_to_staging() procedure
-        # Then processes staging data into final tables using process_staging_to_final() procedure
+        # First processes raw data into staging tables (currency list, live and historical rates in parallel)
+        # Then processes staging data into final tables (currencies, then exchange rates)
+        # Every procedure runs under an advisory lock, so overlapping runs wait for each other
         for layer_pair in [('raw', 'staging'), ('staging', 'final')]:
             layer_from, layer_to = layer_pair
             logger.info(f"Processing data through {layer_from} to {layer_to} layer")
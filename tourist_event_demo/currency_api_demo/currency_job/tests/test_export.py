@@ -0,0 +1,157 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+import pyarrow.parquet as pq
+
+from src.db.export import ParquetExporter, CHANGED_PARTITIONS_QUERY, CURRENCIES_QUERY, PARTITION_QUERY, STATE_FILE
+from src.db.watermarks import CLOCK_QUERY, WATERMARK_OVERLAP
+
+CURRENCIES_UPDATED_QUERY = "SELECT MAX(last_updated) FROM currencies"
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class FakeEngine:
+    """Answers the export queries from in-memory exchange_rates and currencies lists"""
+
+    def __init__(self, rates, currencies, clock):
+        self.rates = rates  # (rate_date, source, target, rate, is_live, created_at, updated_at)
+        self.currencies = currencies  # (code, name, is_active, last_updated)
+        self.clock = clock
+        self.emptied = set()  # (month, source) partitions deleted between listing and reading
+        self.statements = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def execution_options(self, **kwargs):
+        return self
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        if sql == CLOCK_QUERY:
+            return FakeResult([(self.clock,)])
+        if sql == CHANGED_PARTITIONS_QUERY:
+            changed = {(rate_date.strftime('%Y-%m'), source)
+                       for rate_date, source, _, _, _, _, updated_at in self.rates
+                       if params['since'] is None or updated_at > params['since']}
+            return FakeResult(SimpleNamespace(month=month, source_currency=source) for month, source in changed)
+        if sql == PARTITION_QUERY:
+            if (params['month_start'].strftime('%Y-%m'), params['source_currency']) in self.emptied:
+                return FakeResult([])
+            return FakeResult(sorted(
+                (rate_date, target, rate, is_live, created_at, updated_at)
+                for rate_date, source, target, rate, is_live, created_at, updated_at in self.rates
+                if params['month_start'] <= rate_date.date() < params['month_end']
+                and source == params['source_currency']))
+        if sql == CURRENCIES_UPDATED_QUERY:
+            return FakeResult([(max((currency[3] for currency in self.currencies), default=None),)])
+        if sql == CURRENCIES_QUERY:
+            return FakeResult(sorted(self.currencies))
+        raise AssertionError(f"Unexpected query: {sql}")
+
+    def queries(self, sql):
+        return [params for statement, params in self.statements if statement == sql]
+
+
+def rate(rate_date, source, target, value, updated_at):
+    return (rate_date, source, target, Decimal(value), True, updated_at, updated_at)
+
+
+@pytest.fixture
+def engine():
+    """Rates of two months and two sources, all written on 2024-03-01"""
+    written = datetime(2024, 3, 1, 12, 0)
+    return FakeEngine(
+        rates=[
+            rate(datetime(2024, 1, 5), 'USD', 'EUR', '0.910000', written),
+            rate(datetime(2024, 1, 5), 'EUR', 'USD', '1.090000', written),
+            rate(datetime(2024, 2, 5), 'USD', 'EUR', '0.920000', written),
+        ],
+        currencies=[('EUR', 'Euro', True, written), ('USD', 'US Dollar', True, written)],
+        clock=datetime(2024, 3, 2, 0, 0))
+
+
+@pytest.fixture
+def exported(engine, tmp_path):
+    """Exporter whose first, full export already ran"""
+    exporter = ParquetExporter(engine, str(tmp_path))
+    exporter.export()
+    engine.statements.clear()
+    return exporter
+
+def test_full_export(engine, tmp_path):
+    """Without state every partition and the currencies table are written"""
+    stats = ParquetExporter(engine, str(tmp_path)).export()
+
+    assert stats == {'partitions': 3, 'rate_rows': 3, 'currency_rows': 2}
+    assert engine.queries(CHANGED_PARTITIONS_QUERY) == [{'since': None}]
+    table = pq.read_table(os.path.join(tmp_path, 'exchange_rates', 'month=2024-01', 'source_currency=USD', 'data.parquet'))
+    assert table.column('target_currency').to_pylist() == ['EUR']
+    assert 'source_currency' not in table.column_names
+
+def test_state_file_holds_watermark(engine, tmp_path):
+    """Both tables are stamped with the database clock read before the export"""
+    ParquetExporter(engine, str(tmp_path)).export()
+
+    with open(os.path.join(tmp_path, STATE_FILE)) as file:
+        state = json.load(file)
+    assert state == {'exchange_rates': '2024-03-02T00:00:00', 'currencies': '2024-03-02T00:00:00'}
+
+def test_changed_partitions_since_watermark_minus_overlap(engine, exported):
+    """Only partitions with rows updated after the previous watermark minus the overlap are rewritten"""
+    engine.clock = datetime(2024, 3, 3, 0, 0)
+    # Committed late: stamped before the previous watermark but inside the overlap window
+    engine.rates.append(rate(datetime(2024, 2, 6), 'USD', 'EUR', '0.930000', datetime(2024, 3, 1, 23, 30)))
+
+    stats = exported.export()
+
+    assert engine.queries(CHANGED_PARTITIONS_QUERY) == [{'since': datetime(2024, 3, 2) - WATERMARK_OVERLAP}]
+    assert stats['partitions'] == 1
+    assert [params['source_currency'] for params in engine.queries(PARTITION_QUERY)] == ['USD']
+    assert pq.read_table(exported._partition_path('2024-02', 'USD')).num_rows == 2
+
+def test_emptied_partition_file_removed(engine, exported):
+    """A listed partition that no longer has rows loses its file"""
+    engine.rates.append(rate(datetime(2024, 1, 6), 'EUR', 'USD', '1.080000', datetime(2024, 3, 2, 6, 0)))
+    engine.emptied.add(('2024-01', 'EUR'))
+    assert os.path.exists(exported._partition_path('2024-01', 'EUR'))
+
+    stats = exported.export()
+
+    assert stats['partitions'] == 1 and stats['rate_rows'] == 0
+    assert not os.path.exists(exported._partition_path('2024-01', 'EUR'))
+    assert not os.path.exists(exported._partition_path('2024-01', 'EUR') + '.tmp')
+
+def test_unchanged_currencies_skipped(engine, exported):
+    """Currencies are only rewritten when modified after the previous watermark minus the overlap"""
+    assert exported.export()['currency_rows'] == 0
+    assert engine.queries(CURRENCIES_QUERY) == []
+
+    engine.currencies.append(('GBP', 'Pound', True, datetime(2024, 3, 2, 6, 0)))
+    assert exported.export()['currency_rows'] == 3
+
+def test_missing_currencies_file_rewritten(engine, exported, tmp_path):
+    os.remove(os.path.join(tmp_path, 'currencies', 'data.parquet'))
+
+    assert exported.export()['currency_rows'] == 2
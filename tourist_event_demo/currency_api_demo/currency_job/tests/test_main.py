@@ -11,7 +11,7 @@ print(f"Parent directory: {parent_dir}")
 print(f"Files in parent directory: {os.listdir(parent_dir)}")
 
 try:
-    from src.main import process_timeframe_data, process_historical_data, initialize_services, main, fetch_currency_list
+    from src.main import process_timeframe_data, process_historical_data, initialize_services, main, fetch_currency_list, export_snapshot, export_final_layer, archive_raw_layer, restore_raw_layer
 except ImportError as e:
     print(f"\nError importing main: {e}")
     print(f"sys.path: {sys.path}")
@@ -29,6 +29,16 @@ class MockArgs:
         self.start_date = kwargs.get('start_date', '2024-01-01')
         self.end_date = kwargs.get('end_date', '2024-01-02')
         self.historical_date = kwargs.get('historical_date', '2024-01-01')
+        self.snapshot = kwargs.get('snapshot', False)
+        self.snapshot_dir = kwargs.get('snapshot_dir', 'snapshots/exchange_rates')
+        self.export = kwargs.get('export', False)
+        self.export_dir = kwargs.get('export_dir', 'export')
+        self.archive_raw = kwargs.get('archive_raw', False)
+        self.retention_days = kwargs.get('retention_days', 90)
+        self.archive_dir = kwargs.get('archive_dir', 'archive')
+        self.restore_raw = kwargs.get('restore_raw', False)
+        self.restore_month = kwargs.get('restore_month', None)
+        self.restore_keep_staging = kwargs.get('restore_keep_staging', False)
 
 @pytest.fixture
 def mock_services():
@@ -203,6 +213,49 @@ def test_main_with_live_rates(mock_services, mock_env_vars):
         # Verify that the layer processing was called
         assert mock_db.process_layer_to_layer.call_count == 2  # raw->staging, staging->final
 
+def test_export_snapshot(mock_services, mock_env_vars):
+    """Test syncing the columnar rate snapshot"""
+    mock_api, mock_db = mock_services
+    mock_db.export_rate_snapshot.return_value = Mock(rows=10)
+    args = MockArgs(snapshot=True, snapshot_dir='/tmp/rates')
+
+    export_snapshot(mock_db, args)
+
+    mock_db.export_rate_snapshot.assert_called_once_with('/tmp/rates')
+    mock_api.get_live_rates.assert_not_called()
+
+def test_export_final_layer(mock_services, mock_env_vars):
+    """Test the incremental Parquet export"""
+    mock_api, mock_db = mock_services
+    mock_db.export_final_layer.return_value = {'partitions': 2, 'rate_rows': 40, 'currency_rows': 3}
+    args = MockArgs(export=True, export_dir='/tmp/lake')
+
+    export_final_layer(mock_db, args)
+
+    mock_db.export_final_layer.assert_called_once_with('/tmp/lake')
+    mock_api.get_live_rates.assert_not_called()
+
+def test_archive_raw_layer(mock_services, mock_env_vars):
+    """Test the raw layer retention"""
+    mock_api, mock_db = mock_services
+    mock_db.archive_raw_layer.return_value = {'raw_live_rates': 30}
+    args = MockArgs(archive_raw=True, retention_days=30, archive_dir='/tmp/archive')
+
+    archive_raw_layer(mock_db, args)
+
+    mock_db.archive_raw_layer.assert_called_once_with('/tmp/archive', 30)
+    mock_api.get_live_rates.assert_not_called()
+
+def test_restore_raw_layer(mock_services, mock_env_vars):
+    """Test restoring one archived month"""
+    mock_api, mock_db = mock_services
+    mock_db.restore_raw_layer.return_value = {'raw_live_rates': 30}
+    args = MockArgs(restore_raw=True, archive_dir='/tmp/archive', restore_month='2024-01')
+
+    restore_raw_layer(mock_db, args)
+
+    mock_db.restore_raw_layer.assert_called_once_with('/tmp/archive', month='2024-01', reprocess=True)
+
 def test_error_handling(mock_services, mock_env_vars):
     """Test error handling in main functions"""
     mock_api, mock_db = mock_services
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from src.db.operations import DatabaseOperations, LAYER_STEPS
+
+
+@pytest.fixture
+def db():
+    """DatabaseOperations with procedure execution recorded instead of run"""
+    db = DatabaseOperations()
+    db.calls = []
+    lock = threading.Lock()
+
+    def record(name):
+        with lock:
+            db.calls.append(name)
+
+    with patch.object(db, 'execute_database_object', side_effect=record), \
+         patch.object(db, 'create_database_object') as create:
+        db.create = create
+        yield db
+
+def test_raw_to_staging_runs_every_piece(db):
+    """Currency list, live and historical pieces all run, then the wrapper is created"""
+    db.process_layer_to_layer('raw', 'staging')
+    assert sorted(db.calls) == sorted(LAYER_STEPS[('raw', 'staging')][0])
+    db.create.assert_called_once_with('process_raw_to_staging')
+
+def test_staging_to_final_runs_currencies_first(db):
+    """exchange_rates references currencies, so rates wait for currencies"""
+    db.process_layer_to_layer('staging', 'final')
+    assert db.calls == ['process_staging_to_final_currencies', 'process_staging_to_final_rates']
+
+def test_unknown_layer_step(db):
+    with pytest.raises(ValueError, match="Unknown layer step"):
+        db.process_layer_to_layer('final', 'raw')
+
+def test_save_raw_historical_rates():
+    """Historical and timeframe responses reach raw_historical_rates"""
+    with patch('src.db.operations.Session') as mock_session_class:
+        session = mock_session_class.return_value.__enter__.return_value
+        DatabaseOperations().save_raw_historical_rates(
+            date='2024-01-01', source_currency='USD', data={'quotes': {'USDEUR': 0.91}})
+
+    record = session.add.call_args[0][0]
+    assert record.__tablename__ == 'raw_historical_rates'
+    assert str(record.date) == '2024-01-01'
+    session.commit.assert_called_once()
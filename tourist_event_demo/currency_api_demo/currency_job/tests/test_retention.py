@@ -0,0 +1,196 @@
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.db.retention import (
+    ARCHIVE_LOCK_SQL, PROMOTED_RULES, RawArchiver, archive_file_path, archive_files, read_archive, write_archive,
+)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeEngine:
+    """In-memory raw and staging tables answering the archive and restore statements"""
+
+    def __init__(self, raw, stg_rates, stg_currencies):
+        self.raw = raw  # table -> list of row dicts
+        self.stg_rates = stg_rates  # dicts with source_id and is_live
+        self.stg_currencies = stg_currencies  # source_ids referenced by stg_currencies
+        self.statements = []
+
+    def connect(self):
+        return self
+
+    def begin(self):
+        return self
+
+    def execution_options(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def promoted(self, table, row):
+        """Python mirror of PROMOTED_RULES"""
+        if table == 'raw_currency_list':
+            return row['id'] not in self.stg_currencies and row['id'] < max(self.stg_currencies, default=0)
+        is_live = table == 'raw_live_rates'
+        return any(sr['source_id'] == row['id'] and sr['is_live'] == is_live for sr in self.stg_rates)
+
+    def archivable(self, table, params):
+        return [row for row in self.raw[table]
+                if row['timestamp'] < params['cutoff'] and self.promoted(table, row)
+                and ('month' not in params or row['timestamp'].strftime('%Y-%m') == params['month'])]
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if sql == str(ARCHIVE_LOCK_SQL):
+            return FakeResult([True])
+        if sql.startswith('VACUUM'):
+            return FakeResult([])
+
+        table = re.search(r'(?:FROM|INTO) (\w+)', sql).group(1)
+        if 'to_char(r."timestamp", \'YYYY-MM\') AS month' in sql:
+            months = {row['timestamp'].strftime('%Y-%m') for row in self.archivable(table, params)}
+            return FakeResult(SimpleNamespace(month=month) for month in months)
+        if 'ORDER BY r.id' in sql:
+            rows = sorted(self.archivable(table, params), key=lambda row: row['id'])
+            return FakeResult(SimpleNamespace(_mapping=dict(row)) for row in rows)
+        if sql.startswith('DELETE FROM stg_rates'):
+            is_live = not sql.endswith('NOT is_live')
+            self.stg_rates = [sr for sr in self.stg_rates
+                              if not (sr['source_id'] in params['ids'] and sr['is_live'] == is_live)]
+            return FakeResult([])
+        if sql.startswith('DELETE FROM'):
+            self.raw[table] = [row for row in self.raw[table] if row['id'] not in params['ids']]
+            return FakeResult([])
+        if 'INSERT INTO' in sql:
+            existing = {row['id'] for row in self.raw[table]}
+            self.raw[table].extend(row for row in params if row['id'] not in existing)
+            return FakeResult([])
+        raise AssertionError(f"Unexpected query: {sql}")
+
+
+@pytest.fixture
+def engine():
+    """Raw rows of two old months and one recent month, partly promoted to staging"""
+    old, older, recent = datetime(2024, 2, 10), datetime(2024, 1, 10), datetime.now()
+    raw = {
+        'raw_currency_list': [
+            {'id': 1, 'timestamp': older, 'raw_data': '{"EUR": "Euro"}', 'status': 'success'},
+            {'id': 2, 'timestamp': old, 'raw_data': '{"EUR": "Euro"}', 'status': 'success'},
+            {'id': 3, 'timestamp': recent, 'raw_data': '{"EUR": "Euro"}', 'status': 'success'},
+        ],
+        'raw_live_rates': [
+            {'id': 1, 'timestamp': older, 'source_currency': 'USD', 'raw_data': '{"quotes": {"USDEUR": 0.91}}', 'status': 'success'},
+            {'id': 2, 'timestamp': old, 'source_currency': 'USD', 'raw_data': '{"quotes": {"USDEUR": 0.92}}', 'status': 'success'},
+            {'id': 3, 'timestamp': old, 'source_currency': 'USD', 'raw_data': '{"quotes": {"USDEUR": 0.93}}', 'status': 'success'},
+            {'id': 4, 'timestamp': recent, 'source_currency': 'USD', 'raw_data': '{"quotes": {"USDEUR": 0.94}}', 'status': 'success'},
+        ],
+        'raw_historical_rates': [
+            {'id': 1, 'timestamp': old, 'date': '2024-02-01', 'source_currency': 'USD', 'raw_data': '{"quotes": {"USDEUR": 0.9}}', 'status': 'success'},
+        ],
+    }
+    stg_rates = [
+        {'source_id': 1, 'is_live': True},
+        {'source_id': 2, 'is_live': True},
+        # live row 3 is not promoted yet; historical row 1 is only matched by a live staging row
+        {'source_id': 4, 'is_live': True},
+    ]
+    # currency list 2 is still referenced by stg_currencies, list 3 is the newest promoted one
+    return FakeEngine(raw, stg_rates, stg_currencies={2, 3})
+
+
+def ids(rows):
+    return [row['id'] for row in rows]
+
+
+def test_archive_round_trip(tmp_path):
+    """Rows come back from the gzipped file as written, raw_data text untouched"""
+    rows = [
+        {'id': 1, 'timestamp': '2024-01-01 10:00:00', 'raw_data': '{"quotes": {"USDEUR": 0.91}}'},
+        {'id': 2, 'timestamp': '2024-01-02 10:00:00', 'raw_data': '{"quotes": {"USDEUR": 0.92}}'},
+    ]
+    file_path = archive_file_path(str(tmp_path), 'raw_live_rates', '2024-01', 1, 2)
+
+    assert write_archive(file_path, rows) == 2
+    assert list(read_archive(file_path)) == rows
+    assert file_path.endswith('raw_live_rates/month=2024-01/part-000000000001-000000000002.jsonl.gz')
+
+def test_archive_files_by_month(tmp_path):
+    for month, first_id in [('2024-01', 1), ('2024-02', 5)]:
+        write_archive(archive_file_path(str(tmp_path), 'raw_live_rates', month, first_id, first_id), [{'id': first_id}])
+
+    assert len(archive_files(str(tmp_path), 'raw_live_rates')) == 2
+    assert [p.split('month=')[1][:7] for p in archive_files(str(tmp_path), 'raw_live_rates', '2024-02')] == ['2024-02']
+    assert archive_files(str(tmp_path), 'raw_historical_rates') == []
+
+def test_promoted_rules_cover_raw_tables():
+    """Every raw table has a rule and currency lists check stg_currencies references"""
+    assert set(PROMOTED_RULES) == {'raw_currency_list', 'raw_live_rates', 'raw_historical_rates'}
+    assert 'stg_currencies sc WHERE sc.source_id = r.id' in PROMOTED_RULES['raw_currency_list']
+    assert 'sr.is_live' in PROMOTED_RULES['raw_live_rates']
+    assert 'NOT sr.is_live' in PROMOTED_RULES['raw_historical_rates']
+
+def test_archive_only_promoted_rows_past_cutoff(engine, tmp_path):
+    """Unpromoted, recent and still referenced rows stay in the raw tables"""
+    stats = RawArchiver(engine, str(tmp_path), retention_days=30).archive()
+
+    assert stats == {'raw_currency_list': 1, 'raw_live_rates': 2, 'raw_historical_rates': 0}
+    assert ids(engine.raw['raw_currency_list']) == [2, 3]
+    assert ids(engine.raw['raw_live_rates']) == [3, 4]
+    assert ids(engine.raw['raw_historical_rates']) == [1]
+    assert sorted(sql for sql in engine.statements if sql.startswith('VACUUM')) == [
+        'VACUUM (ANALYZE) raw_currency_list', 'VACUUM (ANALYZE) raw_live_rates']
+
+def test_archive_month_writes_file_before_delete(engine, tmp_path):
+    """The month's rows are in their file and gone from the table"""
+    archiver = RawArchiver(engine, str(tmp_path), retention_days=30)
+    cutoff = datetime.now() - timedelta(days=30)
+
+    assert archiver._archive_month(engine, 'raw_live_rates', '2024-02', cutoff) == 1
+
+    file_path = archive_file_path(str(tmp_path), 'raw_live_rates', '2024-02', 2, 2)
+    assert ids(read_archive(file_path)) == [2]
+    assert ids(engine.raw['raw_live_rates']) == [1, 3, 4]
+    assert archiver._archive_month(engine, 'raw_live_rates', '2024-03', cutoff) == 0
+
+def test_restore_round_trips_ids_and_reprocesses(engine, tmp_path):
+    """Restored rows come back under their ids with their staging rows removed"""
+    archiver = RawArchiver(engine, str(tmp_path), retention_days=30)
+    archiver.archive(vacuum=False)
+
+    stats = archiver.restore(month='2024-01')
+
+    assert stats == {'raw_currency_list': 1, 'raw_live_rates': 1, 'raw_historical_rates': 0}
+    assert sorted(ids(engine.raw['raw_live_rates'])) == [1, 3, 4]
+    assert sorted(ids(engine.raw['raw_currency_list'])) == [1, 2, 3]
+    assert engine.stg_rates == [{'source_id': 2, 'is_live': True}, {'source_id': 4, 'is_live': True}]
+    assert archive_files(str(tmp_path), 'raw_live_rates', '2024-01') == []
+    assert len(archive_files(str(tmp_path), 'raw_live_rates', '2024-02')) == 1
+
+def test_restore_can_keep_staging(engine, tmp_path):
+    """Without reprocess the staging rows stay and the raw rows are only put back"""
+    archiver = RawArchiver(engine, str(tmp_path), retention_days=30)
+    archiver.archive(vacuum=False)
+
+    archiver.restore(reprocess=False)
+
+    assert sorted(ids(engine.raw['raw_live_rates'])) == [1, 2, 3, 4]
+    assert len(engine.stg_rates) == 3
+    assert not any(sql.startswith('DELETE FROM stg_rates') for sql in engine.statements)
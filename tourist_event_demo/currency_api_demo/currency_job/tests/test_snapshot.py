@@ -0,0 +1,161 @@
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+import numpy as np
+
+from src.db.snapshot import RateSnapshot, to_day_offset, CHANGED_SINCE_QUERY, CLOCK_QUERY, SNAPSHOT_QUERY
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class FakeEngine:
+    """Answers the snapshot queries from an in-memory exchange_rates list"""
+
+    def __init__(self, rates, clock, fail_on_fetch=False):
+        self.rates = rates  # (rate_date, source, target, rate, updated_at)
+        self.clock = clock
+        self.fail_on_fetch = fail_on_fetch
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def execution_options(self, **kwargs):
+        return self
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql == CLOCK_QUERY:
+            return FakeResult([(self.clock,)])
+        if sql == CHANGED_SINCE_QUERY:
+            changed = [rate_date for rate_date, _, _, _, updated_at in self.rates if updated_at > params['since']]
+            return FakeResult([(min(changed) if changed else None,)])
+        if sql == SNAPSHOT_QUERY:
+            if self.fail_on_fetch:
+                raise ConnectionError("connection lost")
+            return FakeResult(sorted(
+                (to_day_offset(rate_date), source, target, rate)
+                for rate_date, source, target, rate, _ in self.rates if rate_date >= params['since']))
+        raise AssertionError(f"Unexpected query: {sql}")
+
+
+class BrokenEngine:
+    def connect(self):
+        raise ConnectionError("database unavailable")
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """Snapshot with two days of USD rates already written"""
+    snapshot = RateSnapshot(str(tmp_path))
+    snapshot.append([
+        (to_day_offset('2024-01-01'), 'USD', 'EUR', 0.91),
+        (to_day_offset('2024-01-01'), 'USD', 'GBP', 0.79),
+        (to_day_offset('2024-01-02'), 'USD', 'EUR', 0.92),
+    ])
+    snapshot._write_meta()
+    return RateSnapshot(str(tmp_path))
+
+def test_snapshot_reopens_from_disk(snapshot):
+    """Columns and pair codes survive a reopen"""
+    assert snapshot.rows == 3
+    assert snapshot.meta['pairs'] == ['USDEUR', 'USDGBP']
+    assert snapshot.last_day == to_day_offset('2024-01-02')
+    assert isinstance(snapshot.columns['rates'], np.memmap)
+
+def test_snapshot_series(snapshot):
+    """A pair's series is returned in day order"""
+    dates, rates = snapshot.series('USD', 'EUR')
+    assert [str(d) for d in dates] == ['2024-01-01', '2024-01-02']
+    assert rates.tolist() == [0.91, 0.92]
+
+    dates, rates = snapshot.series('USD', 'JPY')
+    assert len(dates) == 0 and len(rates) == 0
+
+def test_snapshot_rates_on(snapshot):
+    """All pairs for one day come from a contiguous slice"""
+    assert snapshot.rates_on('2024-01-01') == {'USDEUR': 0.91, 'USDGBP': 0.79}
+    assert snapshot.rates_on('2023-12-31') == {}
+
+def test_snapshot_rejects_out_of_order_append(snapshot):
+    """Appending an earlier day would break the sorted day column"""
+    with pytest.raises(ValueError):
+        snapshot.append([(to_day_offset('2023-12-31'), 'USD', 'EUR', 0.9)])
+
+@pytest.fixture
+def synced(tmp_path):
+    """Snapshot synced once from three days of USDEUR rates"""
+    rates = [(date(2024, 1, day), 'USD', 'EUR', 0.9 + day / 100, datetime(2024, 1, 3)) for day in (1, 2, 3)]
+    engine = FakeEngine(rates, clock=datetime(2024, 1, 3, 12))
+    RateSnapshot(str(tmp_path)).export_from(engine)
+    return engine, str(tmp_path)
+
+def test_export_from_full_sync(synced):
+    engine, path = synced
+    snapshot = RateSnapshot(path)
+    assert snapshot.rows == 3
+    assert snapshot.meta['synced_at'] == '2024-01-03T12:00:00'
+    assert sorted(os.listdir(path)) == ['days.1.bin', 'meta.json', 'pairs.1.bin', 'rates.1.bin']
+
+def test_export_from_rewrites_backfilled_days(synced):
+    """A corrected rate for an earlier day and a new pair reach the snapshot"""
+    engine, path = synced
+    engine.rates[0] = (date(2024, 1, 1), 'USD', 'EUR', 0.5, datetime(2024, 1, 4))
+    engine.rates.append((date(2024, 1, 2), 'USD', 'GBP', 0.79, datetime(2024, 1, 4)))
+    engine.clock = datetime(2024, 1, 4, 12)
+
+    RateSnapshot(path).export_from(engine)
+
+    snapshot = RateSnapshot(path)
+    assert snapshot.rows == 4
+    assert snapshot.series('USD', 'EUR')[1].tolist() == [0.5, 0.92, 0.93]
+    assert snapshot.rates_on('2024-01-02') == {'USDEUR': 0.92, 'USDGBP': 0.79}
+    # The replaced generation stays for readers that opened before the sync
+    assert sorted(os.listdir(path)) == [
+        'days.1.bin', 'days.2.bin', 'meta.json', 'pairs.1.bin', 'pairs.2.bin', 'rates.1.bin', 'rates.2.bin']
+
+def test_reader_outlives_later_syncs(synced):
+    """A reader opened before syncs that delete its generation still reads it"""
+    engine, path = synced
+    reader = RateSnapshot(path)
+    for day in (4, 5):
+        engine.rates.append((date(2024, 1, day), 'USD', 'EUR', 0.9 + day / 100, datetime(2024, 1, day)))
+        engine.clock = datetime(2024, 1, day, 12)
+        RateSnapshot(path).export_from(engine)
+
+    assert not os.path.exists(os.path.join(path, 'days.1.bin'))
+    assert reader.series('USD', 'EUR')[1].tolist() == [0.91, 0.92, 0.93]
+    assert RateSnapshot(path).rows == 5
+
+def test_export_from_failure_keeps_previous_snapshot(synced):
+    """A failed sync leaves the published generation readable, including by open readers"""
+    engine, path = synced
+    reader = RateSnapshot(path)
+    days = reader.columns['days']
+
+    with pytest.raises(ConnectionError):
+        RateSnapshot(path).export_from(BrokenEngine())
+    engine.fail_on_fetch = True
+    failing = RateSnapshot(path)
+    with pytest.raises(ConnectionError):
+        failing.export_from(engine)
+
+    assert failing.rows == 3 and failing.meta['generation'] == 1
+    assert days.tolist() == [to_day_offset(f'2024-01-0{day}') for day in (1, 2, 3)]
+    assert RateSnapshot(path).series('USD', 'EUR')[1].tolist() == [0.91, 0.92, 0.93]
+    assert sorted(os.listdir(path)) == ['days.1.bin', 'meta.json', 'pairs.1.bin', 'rates.1.bin']
+
+    engine.fail_on_fetch = False
+    assert RateSnapshot(path).export_from(engine) == 1
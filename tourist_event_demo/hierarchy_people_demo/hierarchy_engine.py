@@ -0,0 +1,250 @@
+# hierarchy_engine.py
+"""
+In-memory rebuild of PERSON_HIERARCHY.
+
+Same output as recursive_demo.sql (person_id, parent_person_id,
+ancestor_person_id = root of the person's chain), computed in linear time:
+UUIDs are interned to ints, parents live in a flat int array and every chain
+is walked once, with all nodes on the walked path pointed at the root.
+Cycles, people with several parents and chains deeper than max_depth raise
+instead of being cut off at level 100.
+"""
+import os
+import logging
+import argparse
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 100
+BATCH_SIZE = 100000
+
+NO_PARENT = -1
+UNVISITED, IN_PATH, RESOLVED = 0, 1, 2
+
+
+class HierarchyError(Exception):
+    """Base class for invalid hierarchies"""
+
+
+class CycleError(HierarchyError):
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Cycle found in hierarchy (child -> parent): {' -> '.join(cycle)}")
+
+
+class MultipleParentsError(HierarchyError):
+    def __init__(self, person_id: str, parents: Tuple[str, str]):
+        self.person_id = person_id
+        self.parents = parents
+        super().__init__(f"Person {person_id} has more than one parent: {parents[0]}, {parents[1]}")
+
+
+class DepthOverflowError(HierarchyError):
+    def __init__(self, person_id: str, max_depth: int):
+        self.person_id = person_id
+        self.max_depth = max_depth
+        super().__init__(f"Person {person_id} is more than {max_depth} levels below its root")
+
+
+class HierarchyGraph:
+    """Parent pointers over interned person ids"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.parent = array('q')
+        self.root: Optional[array] = None
+        self.depth: Optional[array] = None
+
+    def intern(self, person_id: str) -> int:
+        idx = self.index.get(person_id)
+        if idx is None:
+            idx = len(self.ids)
+            self.index[person_id] = idx
+            self.ids.append(person_id)
+            self.parent.append(NO_PARENT)
+        return idx
+
+    def add_edge(self, parent_id: str, child_id: str):
+        parent, child = self.intern(parent_id), self.intern(child_id)
+        current = self.parent[child]
+        if current != NO_PARENT and current != parent:
+            raise MultipleParentsError(child_id, (self.ids[current], parent_id))
+        self.parent[child] = parent
+        self.root = None
+
+    def set_parent(self, child_id: str, parent_id: Optional[str]):
+        """Replace a person's parent; None makes the person a root"""
+        child = self.intern(child_id)
+        self.parent[child] = NO_PARENT if parent_id is None else self.intern(parent_id)
+        self.root = None
+
+    def parent_of(self, person_id: str) -> Optional[str]:
+        idx = self.index.get(person_id)
+        if idx is None or self.parent[idx] == NO_PARENT:
+            return None
+        return self.ids[self.parent[idx]]
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[str, str]], people: Iterable[str] = ()) -> 'HierarchyGraph':
+        graph = cls()
+        for person_id in people:
+            graph.intern(person_id)
+        for parent_id, child_id in edges:
+            graph.add_edge(parent_id, child_id)
+        return graph
+
+    def resolve(self, max_depth: int = MAX_DEPTH):
+        """Compute root and depth for every node, visiting each node once"""
+        size = len(self.ids)
+        parent = self.parent
+        root = array('q', [NO_PARENT]) * size
+        depth = array('l', [0]) * size
+        state = bytearray(size)
+        path: List[int] = []
+
+        for start in range(size):
+            if state[start] == RESOLVED:
+                continue
+            node = start
+            while state[node] == UNVISITED:
+                state[node] = IN_PATH
+                path.append(node)
+                if parent[node] == NO_PARENT:
+                    break
+                node = parent[node]
+            else:
+                if state[node] == IN_PATH:
+                    cycle = path[path.index(node):] + [node]
+                    raise CycleError([self.ids[i] for i in cycle])
+
+            # `node` is either a resolved ancestor or the root that ended the walk
+            if state[node] == RESOLVED:
+                top_root, top_depth = root[node], depth[node]
+            else:
+                path.pop()
+                root[node], depth[node], state[node] = node, 0, RESOLVED
+                top_root, top_depth = node, 0
+
+            # Unwind: every node on the path points straight at the root
+            while path:
+                node = path.pop()
+                top_depth += 1
+                if top_depth > max_depth:
+                    raise DepthOverflowError(self.ids[node], max_depth)
+                root[node], depth[node], state[node] = top_root, top_depth, RESOLVED
+
+        self.root, self.depth = root, depth
+        return root, depth
+
+    def rows(self, people: Optional[Iterable[str]] = None,
+             max_depth: int = MAX_DEPTH) -> Iterator[Tuple[str, Optional[str], str]]:
+        """Yield (person_id, parent_person_id, ancestor_person_id) for each person"""
+        if self.root is None:
+            self.resolve(max_depth)
+        ids, parent, root = self.ids, self.parent, self.root
+        indexes = range(len(ids)) if people is None else (self.intern_existing(p) for p in people)
+        for idx in indexes:
+            parent_idx = parent[idx]
+            yield ids[idx], (ids[parent_idx] if parent_idx != NO_PARENT else None), ids[root[idx]]
+
+    def intern_existing(self, person_id: str) -> int:
+        try:
+            return self.index[person_id]
+        except KeyError:
+            raise HierarchyError(f"Unknown person {person_id}") from None
+
+
+def fetch_batches(cursor, query: str, batch_size: int = BATCH_SIZE) -> Iterator[Tuple]:
+    cursor.execute(query)
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield from batch
+
+
+def load_graph(conn) -> Tuple[HierarchyGraph, List[str]]:
+    """Load PEOPLE and HIERARCHY into a graph; returns the graph and the distinct people"""
+    cursor = conn.cursor()
+    try:
+        people = list(dict.fromkeys(row[0] for row in fetch_batches(cursor, "SELECT PERSON_ID FROM PEOPLE")))
+        graph = HierarchyGraph.from_edges(
+            fetch_batches(cursor, "SELECT PARENT_PERSON_ID, CHILD_PERSON_ID FROM HIERARCHY"), people)
+    finally:
+        cursor.close()
+    logger.info(f"Loaded {len(people)} people and {len(graph.ids)} hierarchy nodes")
+    return graph, people
+
+
+def write_person_hierarchy(conn, rows: Iterable[Tuple[str, Optional[str], str]], batch_size: int = BATCH_SIZE):
+    """Bulk-load rows into a new table and swap it in for PERSON_HIERARCHY"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE OR REPLACE TABLE PERSON_HIERARCHY_NEW (
+                PERSON_ID STRING,
+                PARENT_PERSON_ID STRING,
+                ANCESTOR_PERSON_ID STRING
+            )
+        """)
+        batch, written = [], 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany("INSERT INTO PERSON_HIERARCHY_NEW VALUES (%s, %s, %s)", batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany("INSERT INTO PERSON_HIERARCHY_NEW VALUES (%s, %s, %s)", batch)
+            written += len(batch)
+
+        cursor.execute("CREATE TABLE IF NOT EXISTS PERSON_HIERARCHY LIKE PERSON_HIERARCHY_NEW")
+        cursor.execute("ALTER TABLE PERSON_HIERARCHY_NEW SWAP WITH PERSON_HIERARCHY")
+        cursor.execute("DROP TABLE PERSON_HIERARCHY_NEW")
+    finally:
+        cursor.close()
+    logger.info(f"Wrote {written} rows to PERSON_HIERARCHY")
+    return written
+
+
+def connect():
+    """Snowflake connection from SNOWFLAKE_* environment variables"""
+    import snowflake.connector
+
+    return snowflake.connector.connect(
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+        database=os.getenv('SNOWFLAKE_DATABASE'),
+        schema=os.getenv('SNOWFLAKE_SCHEMA', 'PUBLIC'),
+    )
+
+
+def rebuild_person_hierarchy(conn, max_depth: int = MAX_DEPTH) -> int:
+    graph, people = load_graph(conn)
+    graph.resolve(max_depth)
+    return write_person_hierarchy(conn, graph.rows(people))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Rebuild PERSON_HIERARCHY from HIERARCHY and PEOPLE')
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help='Maximum levels below a root')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    conn = connect()
+    try:
+        rebuild_person_hierarchy(conn, max_depth=args.max_depth)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+# hierarchy_incremental.py
+"""
+Incremental maintenance of PERSON_HIERARCHY.
+
+Given a batch of edge changes, only the subtrees under the changed children
+and the ancestor chains above their new parents are read from HIERARCHY.
+The engine in hierarchy_engine.py resolves that subgraph (catching cycles,
+multiple parents and depth overflows among the touched rows) and only the
+subtree rows are merged back, so an update costs in proportion to the
+subtrees it moves instead of the whole population.
+"""
+import csv
+import logging
+import argparse
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from hierarchy_engine import MAX_DEPTH, BATCH_SIZE, HierarchyError, HierarchyGraph, connect
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ('add', 'move', 'remove')
+
+
+class EdgeChange(NamedTuple):
+    """New parent of a child (None removes its edge) and the parent it must have now (None: no parent)"""
+    child_id: str
+    parent_id: Optional[str]
+    current_parent_id: Optional[str]
+
+
+def parse_changes(rows: Iterable[Sequence[Optional[str]]]) -> List[EdgeChange]:
+    """
+    Turn (operation, parent_id, child_id[, current_parent_id]) rows into one EdgeChange per child.
+
+    add: parent_id becomes the parent of a child without one.
+    move: parent_id replaces current_parent_id.
+    remove: parent_id is the current parent whose edge is dropped.
+    """
+    changes: Dict[str, EdgeChange] = {}
+    for row in rows:
+        operation, parent_id, child_id = row[0], row[1], row[2]
+        current_parent_id = row[3] if len(row) > 3 else None
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}, expected one of {', '.join(OPERATIONS)}")
+        if not parent_id:
+            raise ValueError(f"Operation {operation} on {child_id} needs a parent")
+        if operation == 'move' and not current_parent_id:
+            raise ValueError(f"Operation move on {child_id} needs the current parent")
+        if child_id in changes:
+            raise ValueError(f"Person {child_id} changed more than once in the same batch")
+        if operation == 'add':
+            changes[child_id] = EdgeChange(child_id, parent_id, None)
+        elif operation == 'move':
+            changes[child_id] = EdgeChange(child_id, parent_id, current_parent_id)
+        else:
+            changes[child_id] = EdgeChange(child_id, None, parent_id)
+    return list(changes.values())
+
+
+def plan_update(edges: Iterable[Tuple[Optional[str], str]],
+                subtree: Iterable[str],
+                changes: List[EdgeChange],
+                max_depth: int = MAX_DEPTH) -> List[Tuple[str, Optional[str], str]]:
+    """
+    Resolve the touched subgraph and return the new PERSON_HIERARCHY rows.
+
+    `edges` are the current (parent_id or None, child_id) edges of every
+    loaded node and `subtree` the people whose rows must be rewritten.
+    """
+    graph = HierarchyGraph()
+    for parent_id, child_id in edges:
+        if parent_id is None:
+            graph.intern(child_id)
+        else:
+            graph.add_edge(parent_id, child_id)
+    # Validate every change against the loaded edges before applying any of them
+    for change in changes:
+        current = graph.parent_of(change.child_id)
+        if current != change.current_parent_id:
+            raise HierarchyError(
+                f"Person {change.child_id} has parent {current}, expected {change.current_parent_id}")
+    for change in changes:
+        graph.set_parent(change.child_id, change.parent_id)
+    graph.resolve(max_depth)
+    return list(graph.rows(subtree))
+
+
+SUBTREE_QUERY = """
+    WITH RECURSIVE subtree AS (
+        SELECT CHILD_PERSON_ID AS PERSON_ID, 0 AS LVL
+        FROM HIERARCHY_CHANGES
+        UNION ALL
+        SELECT h.CHILD_PERSON_ID, s.LVL + 1
+        FROM subtree s
+        INNER JOIN HIERARCHY h ON h.PARENT_PERSON_ID = s.PERSON_ID
+        WHERE s.LVL <= %(max_depth)s
+    )
+    SELECT DISTINCT h.PARENT_PERSON_ID, s.PERSON_ID, p.PERSON_ID IS NOT NULL AS IS_PERSON
+    FROM subtree s
+    LEFT JOIN HIERARCHY h ON h.CHILD_PERSON_ID = s.PERSON_ID
+    LEFT JOIN (SELECT DISTINCT PERSON_ID FROM PEOPLE) p ON p.PERSON_ID = s.PERSON_ID
+"""
+
+ANCESTORS_QUERY = """
+    WITH RECURSIVE chain AS (
+        SELECT NEW_PARENT_PERSON_ID AS PERSON_ID, 0 AS LVL
+        FROM HIERARCHY_CHANGES
+        WHERE NEW_PARENT_PERSON_ID IS NOT NULL
+        UNION ALL
+        SELECT h.PARENT_PERSON_ID, c.LVL + 1
+        FROM chain c
+        INNER JOIN HIERARCHY h ON h.CHILD_PERSON_ID = c.PERSON_ID
+        WHERE c.LVL <= %(max_depth)s
+    )
+    SELECT DISTINCT h.PARENT_PERSON_ID, c.PERSON_ID
+    FROM chain c
+    LEFT JOIN HIERARCHY h ON h.CHILD_PERSON_ID = c.PERSON_ID
+"""
+
+MERGE_QUERY = """
+    MERGE INTO PERSON_HIERARCHY ph
+    USING PERSON_HIERARCHY_CHANGES c
+    ON ph.PERSON_ID = c.PERSON_ID
+    WHEN MATCHED THEN UPDATE SET
+        PARENT_PERSON_ID = c.PARENT_PERSON_ID,
+        ANCESTOR_PERSON_ID = c.ANCESTOR_PERSON_ID
+    WHEN NOT MATCHED THEN INSERT (PERSON_ID, PARENT_PERSON_ID, ANCESTOR_PERSON_ID)
+        VALUES (c.PERSON_ID, c.PARENT_PERSON_ID, c.ANCESTOR_PERSON_ID)
+"""
+
+
+def _insert_batches(cursor, query: str, rows: List[Tuple], batch_size: int = BATCH_SIZE):
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(query, rows[start:start + batch_size])
+
+
+def apply_edge_changes(conn, changes: List[EdgeChange], max_depth: int = MAX_DEPTH) -> int:
+    """Apply edge changes to HIERARCHY and patch the affected PERSON_HIERARCHY rows"""
+    if not changes:
+        return 0
+    cursor = conn.cursor()
+    try:
+        # Temporary tables first: DDL would commit an open transaction
+        cursor.execute("CREATE OR REPLACE TEMPORARY TABLE HIERARCHY_CHANGES "
+                       "(CHILD_PERSON_ID STRING, NEW_PARENT_PERSON_ID STRING)")
+        cursor.execute("CREATE OR REPLACE TEMPORARY TABLE PERSON_HIERARCHY_CHANGES "
+                       "(PERSON_ID STRING, PARENT_PERSON_ID STRING, ANCESTOR_PERSON_ID STRING)")
+        _insert_batches(cursor, "INSERT INTO HIERARCHY_CHANGES VALUES (%s, %s)",
+                        [(change.child_id, change.parent_id) for change in changes])
+
+        edges: List[Tuple[Optional[str], str]] = []
+        subtree: Set[str] = set()
+        cursor.execute(SUBTREE_QUERY, {'max_depth': max_depth})
+        for parent_id, person_id, is_person in cursor.fetchall():
+            edges.append((parent_id, person_id))
+            if is_person:
+                subtree.add(person_id)
+        cursor.execute(ANCESTORS_QUERY, {'max_depth': max_depth})
+        edges.extend(cursor.fetchall())
+
+        unknown = {change.child_id for change in changes} - subtree
+        if unknown:
+            raise HierarchyError(f"People not found in PEOPLE: {', '.join(sorted(unknown))}")
+
+        rows = plan_update(edges, sorted(subtree), changes, max_depth)
+        _insert_batches(cursor, "INSERT INTO PERSON_HIERARCHY_CHANGES VALUES (%s, %s, %s)", rows)
+
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("DELETE FROM HIERARCHY WHERE CHILD_PERSON_ID IN "
+                           "(SELECT CHILD_PERSON_ID FROM HIERARCHY_CHANGES)")
+            cursor.execute("INSERT INTO HIERARCHY (PARENT_PERSON_ID, CHILD_PERSON_ID) "
+                           "SELECT NEW_PARENT_PERSON_ID, CHILD_PERSON_ID FROM HIERARCHY_CHANGES "
+                           "WHERE NEW_PARENT_PERSON_ID IS NOT NULL")
+            cursor.execute(MERGE_QUERY)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        cursor.close()
+
+    logger.info(f"Applied {len(changes)} edge changes, updated {len(rows)} PERSON_HIERARCHY rows")
+    return len(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Apply HIERARCHY edge changes to PERSON_HIERARCHY')
+    parser.add_argument('changes_file', help='CSV with operation,parent_person_id,child_person_id'
+                                             '[,current_parent_person_id] rows. add: new parent of a '
+                                             'child without one; move: new parent, current parent in the '
+                                             'fourth column; remove: current parent')
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help='Maximum levels below a root')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(args.changes_file, newline='') as file:
+        changes = parse_changes([value or None for value in row] for row in csv.reader(file) if row)
+    conn = connect()
+    try:
+        apply_edge_changes(conn, changes, max_depth=args.max_depth)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import pytest
+
+from hierarchy_engine import (
+    CycleError, DepthOverflowError, HierarchyError, HierarchyGraph, MultipleParentsError)
+
+
+def chain(length):
+    """Edges p0 -> p1 -> ... -> p<length>, so p<length> is `length` levels below p0"""
+    return [(f'p{i}', f'p{i + 1}') for i in range(length)]
+
+def test_forest_roots():
+    """Every tree resolves to its own root; people without edges are their own root"""
+    graph = HierarchyGraph.from_edges(
+        [('a', 'b'), ('b', 'c'), ('a', 'd'), ('x', 'y')], people=['lonely'])
+    rows = {person: (parent, root) for person, parent, root in graph.rows()}
+    assert rows == {
+        'lonely': (None, 'lonely'),
+        'a': (None, 'a'), 'b': ('a', 'a'), 'c': ('b', 'a'), 'd': ('a', 'a'),
+        'x': (None, 'x'), 'y': ('x', 'x'),
+    }
+
+def test_resolve_compresses_paths():
+    """Walking from the deepest node first resolves the whole chain with correct depths"""
+    graph = HierarchyGraph()
+    graph.intern('p5')
+    for parent_id, child_id in chain(5):
+        graph.add_edge(parent_id, child_id)
+    root, depth = graph.resolve()
+    assert [graph.ids[root[graph.index[f'p{i}']]] for i in range(6)] == ['p0'] * 6
+    assert [depth[graph.index[f'p{i}']] for i in range(6)] == [0, 1, 2, 3, 4, 5]
+
+def test_cycle():
+    """The reported cycle excludes the tail that led into it"""
+    graph = HierarchyGraph.from_edges([('a', 'x'), ('b', 'a'), ('a', 'b')], people=['x'])
+    with pytest.raises(CycleError) as error:
+        graph.resolve()
+    assert error.value.cycle == ['a', 'b', 'a']
+
+def test_self_loop():
+    with pytest.raises(CycleError):
+        HierarchyGraph.from_edges([('a', 'a')]).resolve()
+
+def test_depth_limit():
+    """max_depth levels below the root are allowed, one more raises"""
+    HierarchyGraph.from_edges(chain(3)).resolve(max_depth=3)
+    with pytest.raises(DepthOverflowError) as error:
+        HierarchyGraph.from_edges(chain(4)).resolve(max_depth=3)
+    assert error.value.person_id == 'p4'
+
+def test_duplicate_identical_edges():
+    graph = HierarchyGraph.from_edges([('a', 'b'), ('a', 'b')])
+    assert list(graph.rows()) == [('a', None, 'a'), ('b', 'a', 'a')]
+
+def test_multiple_parents():
+    with pytest.raises(MultipleParentsError) as error:
+        HierarchyGraph.from_edges([('a', 'c'), ('b', 'c')])
+    assert error.value.parents == ('a', 'b')
+
+def test_rows_for_unknown_person():
+    with pytest.raises(HierarchyError):
+        list(HierarchyGraph.from_edges([('a', 'b')]).rows(['z']))
@@ -0,0 +1,54 @@
+import pytest
+
+from hierarchy_engine import CycleError, HierarchyError
+from hierarchy_incremental import EdgeChange, parse_changes, plan_update
+
+# a -> b -> c, plus a separate root x
+EDGES = [(None, 'a'), ('a', 'b'), ('b', 'c'), (None, 'x')]
+
+
+def test_parse_changes():
+    assert parse_changes([
+        ('add', 'x', 'y'),
+        ('move', 'x', 'c', 'b'),
+        ('remove', 'a', 'b'),
+    ]) == [
+        EdgeChange('y', 'x', None),
+        EdgeChange('c', 'x', 'b'),
+        EdgeChange('b', None, 'a'),
+    ]
+
+@pytest.mark.parametrize('rows, message', [
+    ([('copy', 'a', 'b')], 'Unknown operation'),
+    ([('add', None, 'b')], 'needs a parent'),
+    ([('remove', None, 'b')], 'needs a parent'),
+    ([('move', 'x', 'c')], 'needs the current parent'),
+    ([('add', 'x', 'y'), ('remove', 'x', 'y')], 'more than once'),
+])
+def test_parse_changes_errors(rows, message):
+    with pytest.raises(ValueError, match=message):
+        parse_changes(rows)
+
+def test_plan_update_move():
+    """Moving b under x re-roots its whole subtree"""
+    rows = plan_update(EDGES, ['b', 'c'], parse_changes([('move', 'x', 'b', 'a')]))
+    assert rows == [('b', 'x', 'x'), ('c', 'b', 'x')]
+
+def test_plan_update_remove_and_add():
+    rows = plan_update(EDGES + [(None, 'y')], ['b', 'c', 'y'],
+                       parse_changes([('remove', 'a', 'b'), ('add', 'c', 'y')]))
+    assert rows == [('b', None, 'b'), ('c', 'b', 'b'), ('y', 'c', 'b')]
+
+@pytest.mark.parametrize('row', [
+    ('add', 'x', 'c'),         # c already has a parent
+    ('move', 'x', 'c', 'a'),   # c's parent is b
+    ('remove', 'a', 'c'),      # c's parent is b
+    ('remove', 'a', 'x'),      # x has no parent
+])
+def test_plan_update_checks_current_parent(row):
+    with pytest.raises(HierarchyError, match='has parent'):
+        plan_update(EDGES, ['c', 'x'], parse_changes([row]))
+
+def test_plan_update_cycle():
+    with pytest.raises(CycleError):
+        plan_update(EDGES, ['a', 'b', 'c'], parse_changes([('add', 'c', 'a')]))
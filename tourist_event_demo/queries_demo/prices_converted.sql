@@ -0,0 +1,245 @@
+-- Precomputed prices in a single reporting currency.
+-- Runs on the same PostgreSQL database as the currency job (currency_api_demo),
+-- reading its final exchange_rates layer.
+
+-- Shared bookkeeping for incrementally refreshed reporting tables
+CREATE TABLE IF NOT EXISTS refresh_watermarks (
+  table_name VARCHAR(100) PRIMARY KEY,
+  source_high_water TIMESTAMP,  -- last source change already applied
+  last_modified TIMESTAMP       -- last time the table contents changed
+);
+
+CREATE TABLE IF NOT EXISTS prices_converted (
+  price_id INTEGER PRIMARY KEY,
+  plan_id INTEGER NOT NULL,
+  price_type VARCHAR(20),
+  currency VARCHAR(5),
+  import NUMERIC(20,6),
+  quantity INTEGER,
+  plan_date DATE,
+  reporting_currency VARCHAR(5) NOT NULL,
+  rate_to_reporting NUMERIC(20,10),
+  amount_reporting NUMERIC(20,6),
+  price_per_person_reporting NUMERIC(20,6),
+  refreshed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_prices_converted_plan
+  ON prices_converted (plan_id, price_type, price_per_person_reporting);
+CREATE INDEX IF NOT EXISTS ix_prices_converted_currency_date
+  ON prices_converted (currency, plan_date);
+
+-- As-of lookups walk a single pair backwards in time
+CREATE INDEX IF NOT EXISTS ix_exchange_rates_pair_date
+  ON exchange_rates (source_currency, target_currency, rate_date DESC);
+
+-- Last known rate to convert 1 unit of p_from into p_to at p_at.
+-- Falls back to the inverse pair and then to a cross rate through USD,
+-- the API's default source currency.
+CREATE OR REPLACE FUNCTION as_of_rate(p_from TEXT, p_to TEXT, p_at TIMESTAMP)
+RETURNS NUMERIC
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_rate NUMERIC;
+BEGIN
+  IF p_from = p_to THEN
+    RETURN 1;
+  END IF;
+
+  SELECT rate INTO v_rate
+  FROM exchange_rates
+  WHERE source_currency = p_from
+  AND target_currency = p_to
+  AND rate_date <= p_at
+  ORDER BY rate_date DESC
+  LIMIT 1;
+  IF v_rate IS NOT NULL THEN
+    RETURN v_rate;
+  END IF;
+
+  SELECT 1 / NULLIF(rate, 0) INTO v_rate
+  FROM exchange_rates
+  WHERE source_currency = p_to
+  AND target_currency = p_from
+  AND rate_date <= p_at
+  ORDER BY rate_date DESC
+  LIMIT 1;
+  IF v_rate IS NOT NULL THEN
+    RETURN v_rate;
+  END IF;
+
+  IF p_from <> 'USD' AND p_to <> 'USD' THEN
+    RETURN as_of_rate('USD', p_to, p_at) / NULLIF(as_of_rate('USD', p_from, p_at), 0);
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+-- Refresh only the prices whose inputs changed (new/edited/deleted prices,
+-- moved plan dates) or whose as-of rate may have changed since the last run.
+CREATE OR REPLACE PROCEDURE refresh_prices_converted(p_reporting_currency TEXT DEFAULT 'USD')
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  -- exchange_rates.updated_at is the writer's transaction start, which can be
+  -- well before its commit; rates stamped this long before the previous
+  -- watermark are read again
+  c_watermark_overlap CONSTANT INTERVAL := INTERVAL '1 hour';
+  v_rates_watermark TIMESTAMP;
+  v_rates_high_water TIMESTAMP;
+  v_count INTEGER;
+  v_changed INTEGER := 0;
+BEGIN
+  SELECT source_high_water INTO v_rates_watermark
+  FROM refresh_watermarks
+  WHERE table_name = 'prices_converted';
+
+  -- Clock before reading, so rates committed mid-refresh are picked up next time
+  v_rates_high_water := clock_timestamp()::timestamp;
+
+  DELETE FROM prices_converted pc
+  WHERE NOT EXISTS (SELECT 1 FROM prices p WHERE p.price_id = pc.price_id);
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  v_changed := v_changed + v_count;
+
+  DROP TABLE IF EXISTS tmp_prices_to_refresh;
+  CREATE TEMP TABLE tmp_prices_to_refresh ON COMMIT DROP AS
+  WITH changed_rates AS (
+    SELECT source_currency, target_currency, rate_date::date AS rate_day
+    FROM exchange_rates
+    WHERE v_rates_watermark IS NULL
+    OR updated_at > v_rates_watermark - c_watermark_overlap
+  ),
+  -- as_of_rate(currency, reporting) only reads pairs between the currency and
+  -- the reporting currency or USD (either direction). A changed USD/reporting
+  -- pair feeds every cross rate: currency NULL stands for all currencies.
+  touched_currencies AS (
+    SELECT
+      CASE
+        WHEN target_currency NOT IN (p_reporting_currency, 'USD') THEN target_currency
+        WHEN source_currency NOT IN (p_reporting_currency, 'USD') THEN source_currency
+      END AS currency,
+      MIN(rate_day) AS since_day
+    FROM changed_rates
+    WHERE source_currency IN (p_reporting_currency, 'USD')
+    OR target_currency IN (p_reporting_currency, 'USD')
+    GROUP BY 1
+  )
+  SELECT
+    r.price_id,
+    r.plan_id,
+    r.type AS price_type,
+    r.currency,
+    r.import,
+    r.quantity,
+    p.dt_start::date AS plan_date
+  FROM prices r
+  INNER JOIN plan p
+    ON p.plan_id = r.plan_id
+  LEFT JOIN prices_converted pc
+    ON pc.price_id = r.price_id
+  WHERE pc.price_id IS NULL
+    OR pc.reporting_currency <> p_reporting_currency
+    OR pc.amount_reporting IS NULL
+    OR (r.plan_id, r.type, r.currency, r.import, r.quantity, p.dt_start::date)
+       IS DISTINCT FROM
+       (pc.plan_id, pc.price_type, pc.currency, pc.import, pc.quantity, pc.plan_date)
+    OR EXISTS (
+      SELECT 1
+      FROM touched_currencies t
+      WHERE (t.currency IS NULL OR t.currency = pc.currency)
+      AND pc.plan_date >= t.since_day
+    );
+
+  -- One as-of lookup per distinct (currency, day) instead of per price row
+  DROP TABLE IF EXISTS tmp_price_rates;
+  CREATE TEMP TABLE tmp_price_rates ON COMMIT DROP AS
+  SELECT
+    currency,
+    plan_date,
+    as_of_rate(currency, p_reporting_currency, (plan_date + 1)::timestamp - INTERVAL '1 microsecond') AS rate
+  FROM (
+    SELECT DISTINCT currency, plan_date
+    FROM tmp_prices_to_refresh
+    WHERE currency IS NOT NULL AND plan_date IS NOT NULL
+  ) d;
+
+  INSERT INTO prices_converted (
+    price_id,
+    plan_id,
+    price_type,
+    currency,
+    import,
+    quantity,
+    plan_date,
+    reporting_currency,
+    rate_to_reporting,
+    amount_reporting,
+    price_per_person_reporting,
+    refreshed_at
+  )
+  SELECT
+    t.price_id,
+    t.plan_id,
+    t.price_type,
+    t.currency,
+    t.import,
+    t.quantity,
+    t.plan_date,
+    p_reporting_currency,
+    tr.rate,
+    t.import * tr.rate,
+    CASE
+      WHEN t.price_type = 'SINGLE' THEN t.import * tr.rate
+      ELSE t.import * tr.rate / NULLIF(t.quantity, 0)
+    END,
+    CURRENT_TIMESTAMP
+  FROM tmp_prices_to_refresh t
+  LEFT JOIN tmp_price_rates tr
+    -- Prices without currency or date have no rate and keep a NULL conversion
+    ON tr.currency = t.currency
+    AND tr.plan_date = t.plan_date
+  ON CONFLICT (price_id)
+  DO UPDATE SET
+    plan_id = EXCLUDED.plan_id,
+    price_type = EXCLUDED.price_type,
+    currency = EXCLUDED.currency,
+    import = EXCLUDED.import,
+    quantity = EXCLUDED.quantity,
+    plan_date = EXCLUDED.plan_date,
+    reporting_currency = EXCLUDED.reporting_currency,
+    rate_to_reporting = EXCLUDED.rate_to_reporting,
+    amount_reporting = EXCLUDED.amount_reporting,
+    price_per_person_reporting = EXCLUDED.price_per_person_reporting,
+    refreshed_at = EXCLUDED.refreshed_at
+  -- Re-scanned rows that did not change are left alone (no summary refresh, no cache bust)
+  WHERE (prices_converted.plan_id, prices_converted.price_type, prices_converted.currency,
+         prices_converted.import, prices_converted.quantity, prices_converted.plan_date,
+         prices_converted.reporting_currency, prices_converted.rate_to_reporting,
+         prices_converted.amount_reporting, prices_converted.price_per_person_reporting)
+    IS DISTINCT FROM
+        (EXCLUDED.plan_id, EXCLUDED.price_type, EXCLUDED.currency,
+         EXCLUDED.import, EXCLUDED.quantity, EXCLUDED.plan_date,
+         EXCLUDED.reporting_currency, EXCLUDED.rate_to_reporting,
+         EXCLUDED.amount_reporting, EXCLUDED.price_per_person_reporting);
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  v_changed := v_changed + v_count;
+  RAISE NOTICE 'Refreshed % rows in prices_converted (%)', v_count, p_reporting_currency;
+
+  INSERT INTO refresh_watermarks (table_name, source_high_water, last_modified)
+  VALUES ('prices_converted', v_rates_high_water, CURRENT_TIMESTAMP)
+  ON CONFLICT (table_name)
+  DO UPDATE SET
+    source_high_water = EXCLUDED.source_high_water,
+    last_modified = CASE
+      WHEN v_changed > 0 THEN EXCLUDED.last_modified
+      ELSE refresh_watermarks.last_modified
+    END;
+END;
+$$;
+
+-- Usage:
+-- CALL refresh_prices_converted('EUR');
@@ -1,24 +1,15 @@
-WITH plan_reviews AS (
-  SELECT 
-    p.plan_id,
-    p.plan_name,
-    COUNT(r.review_id) as total_reviews,
-    AVG(r.rating) as avg_rating,
-    STRING_AGG(r.comment, ' | ') as all_comments
-  FROM plan p
-  INNER JOIN review r ON r.plan_id = p.plan_id
-  WHERE p.status = 'ACTIVE'
-    AND r.status = 'APPROVED'
-  GROUP BY 1, 2
-),
-ranked_reviews AS (
+-- Reads the summary maintained by report_summaries.sql (approved reviews only)
+WITH ranked_reviews AS (
   SELECT 
     plan_name,
     total_reviews,
-    avg_rating,
+    rating_sum / total_reviews as avg_rating,
     all_comments,
-    RANK() OVER (ORDER BY avg_rating ASC) as worst_rank
-  FROM plan_reviews
+    RANK() OVER (ORDER BY rating_sum / total_reviews ASC) as worst_rank
+  FROM rpt_plan_stats
+  WHERE plan_status = :status
+    AND total_reviews > 0
+    AND (CAST(:city AS TEXT) IS NULL OR city_name = :city)
 )
 SELECT *
 FROM ranked_reviews
@@ -0,0 +1,169 @@
+# report_runner.py
+import os
+import re
+import json
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERIES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Report scripts; prices_converted.sql and report_summaries.sql are setup scripts
+REPORTS = ('category_prices', 'ranked_days', 'ranked_reviews', 'sold_plans', 'venue_events')
+
+DEFAULT_PARAMS = {
+    'status': 'ACTIVE',
+    'city': None,
+    'start_date': None,
+    'end_date': None,
+}
+
+# `:name` binds, skipping `::type` casts
+BIND_PATTERN = re.compile(r'(?<![:\w]):(\w+)')
+TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)', re.IGNORECASE)
+CTE_PATTERN = re.compile(r'\b(\w+)\s+AS\s*\(', re.IGNORECASE)
+COMMENT_PATTERN = re.compile(r'--[^\n]*')
+
+WATERMARK_QUERY = text("""
+    SELECT COUNT(*) AS tracked, MAX(last_modified) AS last_modified
+    FROM refresh_watermarks
+    WHERE table_name IN :tables
+""").bindparams(bindparam('tables', expanding=True))
+
+
+class ReportQuery:
+    """A report script with the bind parameters and tables it reads"""
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.statement = text(sql)
+        code = COMMENT_PATTERN.sub('', sql)
+        self.params = sorted(set(BIND_PATTERN.findall(code)))
+        ctes = {cte.lower() for cte in CTE_PATTERN.findall(code)}
+        self.tables = sorted({table.lower() for table in TABLE_PATTERN.findall(code)} - ctes)
+
+    @classmethod
+    def load(cls, name: str, queries_dir: str = QUERIES_DIR) -> 'ReportQuery':
+        with open(os.path.join(queries_dir, f'{name}.sql'), 'r') as file:
+            return cls(name, file.read())
+
+    def bind(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge defaults with the given params, keeping only the ones this query uses"""
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {', '.join(sorted(unknown))}")
+        # A filter the query cannot apply would silently return unfiltered results
+        unsupported = {k for k, v in params.items() if v is not None} - set(self.params)
+        if unsupported:
+            raise ValueError(f"{self.name} does not filter by: {', '.join(sorted(unsupported))}")
+        merged = {**DEFAULT_PARAMS, **{k: v for k, v in params.items() if v is not None}}
+        return {name: merged.get(name) for name in self.params}
+
+
+class ReportRunner:
+    """
+    Runs the queries_demo reports through a pooled engine and caches results.
+
+    Cache entries are keyed by report + bound params and stay valid while the
+    refresh_watermarks entries of every table the report reads are unchanged.
+    Reports reading a table without a watermark are never cached. The runner
+    can be shared between threads and every call gets its own copy of the rows.
+    """
+
+    def __init__(self, engine=None, queries_dir: str = QUERIES_DIR, cache_size: int = 128):
+        self.engine = engine or create_engine(
+            f"postgresql://{os.getenv('POSTGRES_USER', 'postgres')}:{os.getenv('POSTGRES_PASSWORD', 'password')}@"
+            f"{os.getenv('POSTGRES_HOST', 'localhost')}:{os.getenv('POSTGRES_PORT', '5432')}/"
+            f"{os.getenv('POSTGRES_DB', 'exchange_rates')}",
+            pool_size=int(os.getenv('POSTGRES_POOL_SIZE', '5')),
+            pool_pre_ping=True,
+        )
+        self.queries = {name: ReportQuery.load(name, queries_dir) for name in REPORTS}
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple, Tuple[Any, List[Dict[str, Any]]]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _watermark(self, conn, query: ReportQuery) -> Optional[Any]:
+        """Latest modification of the query's tables, or None if any of them is untracked"""
+        row = conn.execute(WATERMARK_QUERY, {'tables': query.tables}).one()
+        if row.tracked < len(query.tables):
+            return None
+        return row.last_modified
+
+    def run(self, report: str, **params) -> List[Dict[str, Any]]:
+        """Run a report, serving it from cache when its tables did not change"""
+        if report not in self.queries:
+            raise ValueError(f"Unknown report: {report}")
+        query = self.queries[report]
+        bound = query.bind(params)
+        key = (report, tuple(sorted(bound.items())))
+
+        try:
+            with self.engine.connect() as conn:
+                watermark = self._watermark(conn, query)
+                with self._cache_lock:
+                    cached = self._cache.get(key)
+                    if watermark is not None and cached is not None and cached[0] == watermark:
+                        self._cache.move_to_end(key)
+                        logger.info(f"Serving {report} from cache")
+                        return [dict(row) for row in cached[1]]
+
+                logger.info(f"Executing {report} with {bound}")
+                rows = [dict(row._mapping) for row in conn.execute(query.statement, bound)]
+        except SQLAlchemyError as e:
+            logger.error(f"Error running report {report}: {str(e)}")
+            raise
+
+        if watermark is not None:
+            with self._cache_lock:
+                self._cache[key] = (watermark, [dict(row) for row in rows])
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return rows
+
+    def invalidate(self, report: Optional[str] = None):
+        """Drop cached results for one report or for all of them"""
+        with self._cache_lock:
+            if report is None:
+                self._cache.clear()
+                return
+            for key in [key for key in self._cache if key[0] == report]:
+                del self._cache[key]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run a queries_demo report')
+    parser.add_argument('report', choices=REPORTS, help='Report to run')
+    parser.add_argument('--status', type=str, help='Plan status (default: ACTIVE)')
+    parser.add_argument('--city', type=str, help='City name')
+    parser.add_argument('--start-date', type=str, help='Start date in YYYY-MM-DD format')
+    parser.add_argument('--end-date', type=str, help='End date in YYYY-MM-DD format')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    runner = ReportRunner()
+    rows = runner.run(
+        args.report,
+        status=args.status,
+        city=args.city,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    for row in rows:
+        print(json.dumps(row, default=str))
+
+
+if __name__ == '__main__':
+    main()
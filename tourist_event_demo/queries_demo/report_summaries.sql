@@ -0,0 +1,396 @@
+-- Summary tables behind the queries_demo reports.
+-- Statement-level triggers record which plans changed in rpt_dirty_plans;
+-- refresh_report_summaries() recomputes the per-plan facts for those plans
+-- only and then the report rollup rows they belong to (before and after the
+-- change). Requires prices_converted.sql to be installed first.
+
+-- Append-only change log: the triggers only insert, so writes to the source
+-- tables never wait on a running refresh. The refresh de-duplicates the plans
+-- and deletes exactly the log rows it read.
+CREATE TABLE IF NOT EXISTS rpt_dirty_plans (
+  id BIGSERIAL PRIMARY KEY,
+  plan_id INTEGER NOT NULL
+);
+
+-- Earlier installs keyed the queue by plan_id; keep queued plans when upgrading
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'rpt_dirty_plans' AND column_name = 'id'
+  ) THEN
+    ALTER TABLE rpt_dirty_plans DROP CONSTRAINT rpt_dirty_plans_pkey;
+    ALTER TABLE rpt_dirty_plans ADD COLUMN id BIGSERIAL PRIMARY KEY;
+  END IF;
+END;
+$$;
+
+-- One row per plan with everything the reports aggregate
+CREATE TABLE IF NOT EXISTS rpt_plan_stats (
+  plan_id INTEGER PRIMARY KEY,
+  plan_name VARCHAR(255),
+  plan_status VARCHAR(20),
+  day_of_week VARCHAR(9),
+  venue_id INTEGER,
+  venue_name VARCHAR(255),
+  city_name VARCHAR(255),
+  country_name VARCHAR(255),
+  category_main_id INTEGER,
+  category_name VARCHAR(255),
+  total_events INTEGER NOT NULL DEFAULT 0,
+  total_reviews INTEGER NOT NULL DEFAULT 0,  -- approved reviews only
+  rating_sum NUMERIC NOT NULL DEFAULT 0,
+  all_comments TEXT,
+  min_single_price NUMERIC(20,6),
+  min_group_price_per_person NUMERIC(20,6),
+  refreshed_at TIMESTAMP
+);
+
+-- Paid tickets per plan and sale day
+CREATE TABLE IF NOT EXISTS rpt_plan_daily_tickets (
+  plan_id INTEGER,
+  sale_date DATE,
+  tickets_sold BIGINT NOT NULL,
+  PRIMARY KEY (plan_id, sale_date)
+);
+
+-- ranked_days.sql
+CREATE TABLE IF NOT EXISTS rpt_city_weekday_plans (
+  city_name VARCHAR(255),
+  day_of_week VARCHAR(9),
+  plan_status VARCHAR(20),
+  plans_count INTEGER NOT NULL,
+  PRIMARY KEY (city_name, day_of_week, plan_status)
+);
+
+-- sold_plans.sql
+CREATE TABLE IF NOT EXISTS rpt_country_daily_tickets (
+  country_name VARCHAR(255),
+  plan_status VARCHAR(20),
+  sale_date DATE,
+  tickets_sold BIGINT NOT NULL,
+  PRIMARY KEY (country_name, plan_status, sale_date)
+);
+
+-- venue_events.sql
+CREATE TABLE IF NOT EXISTS rpt_venue_events (
+  venue_id INTEGER,
+  plan_status VARCHAR(20),
+  venue_name VARCHAR(255),
+  total_events INTEGER NOT NULL,
+  total_plans INTEGER NOT NULL,
+  PRIMARY KEY (venue_id, plan_status)
+);
+
+-- category_prices.sql
+CREATE TABLE IF NOT EXISTS rpt_category_prices (
+  category_main_id INTEGER,
+  plan_status VARCHAR(20),
+  category_name VARCHAR(255),
+  min_single_price NUMERIC(20,6),
+  min_group_price_per_person NUMERIC(20,6),
+  PRIMARY KEY (category_main_id, plan_status)
+);
+
+CREATE INDEX IF NOT EXISTS ix_rpt_plan_stats_status_rating
+  ON rpt_plan_stats (plan_status, total_reviews);
+
+-- Change capture: map changed rows of any source table to the plans they affect
+CREATE OR REPLACE FUNCTION rpt_mark_dirty_plans()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_query TEXT;
+  v_transition_table TEXT;
+BEGIN
+  v_query := CASE TG_TABLE_NAME
+    WHEN 'venue' THEN
+      'SELECT p.plan_id FROM plan p WHERE p.venue_id IN (SELECT venue_id FROM %I)'
+    WHEN 'city' THEN
+      'SELECT p.plan_id FROM plan p INNER JOIN venue v ON v.venue_id = p.venue_id
+       WHERE v.city_id IN (SELECT city_id FROM %I)'
+    WHEN 'countries' THEN
+      'SELECT p.plan_id FROM plan p INNER JOIN venue v ON v.venue_id = p.venue_id
+       INNER JOIN city y ON y.city_id = v.city_id
+       WHERE y.country_id IN (SELECT country_id FROM %I)'
+    WHEN 'category_main' THEN
+      'SELECT p.plan_id FROM plan p WHERE p.category_main_id IN (SELECT category_main_id FROM %I)'
+    ELSE
+      'SELECT plan_id FROM %I WHERE plan_id IS NOT NULL'
+  END;
+
+  FOREACH v_transition_table IN ARRAY CASE TG_OP
+    WHEN 'INSERT' THEN ARRAY['new_rows']
+    WHEN 'UPDATE' THEN ARRAY['old_rows', 'new_rows']
+    ELSE ARRAY['old_rows']
+  END LOOP
+    EXECUTE format(
+      'INSERT INTO rpt_dirty_plans (plan_id) SELECT DISTINCT plan_id FROM (' || v_query || ') changed',
+      v_transition_table);
+  END LOOP;
+
+  RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+  v_table TEXT;
+  v_op TEXT;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY[
+    'plan', 'event', 'ticket', 'review', 'prices_converted',
+    'venue', 'city', 'countries', 'category_main'
+  ] LOOP
+    FOREACH v_op IN ARRAY ARRAY['INSERT', 'UPDATE', 'DELETE'] LOOP
+      EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'rpt_dirty_' || lower(v_op), v_table);
+      EXECUTE format(
+        'CREATE TRIGGER %I AFTER %s ON %I REFERENCING %s FOR EACH STATEMENT EXECUTE FUNCTION rpt_mark_dirty_plans()',
+        'rpt_dirty_' || lower(v_op),
+        v_op,
+        v_table,
+        CASE v_op
+          WHEN 'INSERT' THEN 'NEW TABLE AS new_rows'
+          WHEN 'UPDATE' THEN 'OLD TABLE AS old_rows NEW TABLE AS new_rows'
+          ELSE 'OLD TABLE AS old_rows'
+        END);
+    END LOOP;
+  END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE PROCEDURE refresh_report_summaries()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_dirty_count INTEGER;
+BEGIN
+  -- Claim the log rows visible now. Rows committed later (even with lower ids)
+  -- stay queued for the next refresh; deleting by id never touches them, so
+  -- concurrent trigger inserts do not wait on this transaction.
+  DROP TABLE IF EXISTS tmp_rpt_claimed;
+  CREATE TEMP TABLE tmp_rpt_claimed ON COMMIT DROP AS
+  SELECT id, plan_id FROM rpt_dirty_plans;
+
+  DELETE FROM rpt_dirty_plans q USING tmp_rpt_claimed c WHERE q.id = c.id;
+
+  DROP TABLE IF EXISTS tmp_rpt_dirty;
+  CREATE TEMP TABLE tmp_rpt_dirty ON COMMIT DROP AS
+  SELECT DISTINCT plan_id FROM tmp_rpt_claimed;
+
+  SELECT COUNT(*) INTO v_dirty_count FROM tmp_rpt_dirty;
+  RAISE NOTICE 'Refreshing report summaries for % plans', v_dirty_count;
+  IF v_dirty_count = 0 THEN
+    RETURN;
+  END IF;
+  -- Temp tables have no statistics until analyzed; the planner would assume
+  -- a few hundred rows and pick hash joins that blow up on the rollups
+  ANALYZE tmp_rpt_dirty;
+
+  -- Rollup keys the dirty plans contributed to before the change
+  DROP TABLE IF EXISTS tmp_rpt_old_plans;
+  CREATE TEMP TABLE tmp_rpt_old_plans ON COMMIT DROP AS
+  SELECT s.*
+  FROM rpt_plan_stats s
+  INNER JOIN tmp_rpt_dirty d ON d.plan_id = s.plan_id;
+
+  DROP TABLE IF EXISTS tmp_rpt_touched_tickets;
+  CREATE TEMP TABLE tmp_rpt_touched_tickets ON COMMIT DROP AS
+  SELECT DISTINCT s.country_name, s.plan_status, t.sale_date
+  FROM rpt_plan_daily_tickets t
+  INNER JOIN tmp_rpt_old_plans s ON s.plan_id = t.plan_id;
+
+  DELETE FROM rpt_plan_stats s USING tmp_rpt_dirty d WHERE s.plan_id = d.plan_id;
+  DELETE FROM rpt_plan_daily_tickets t USING tmp_rpt_dirty d WHERE t.plan_id = d.plan_id;
+
+  INSERT INTO rpt_plan_stats (
+    plan_id,
+    plan_name,
+    plan_status,
+    day_of_week,
+    venue_id,
+    venue_name,
+    city_name,
+    country_name,
+    category_main_id,
+    category_name,
+    total_events,
+    total_reviews,
+    rating_sum,
+    all_comments,
+    min_single_price,
+    min_group_price_per_person,
+    refreshed_at
+  )
+  SELECT
+    p.plan_id,
+    p.plan_name,
+    p.status,
+    TO_CHAR(p.dt_start, 'Day'),
+    v.venue_id,
+    v.venue_name,
+    y.city_name,
+    c.country_name,
+    cm.category_main_id,
+    cm.category_name,
+    COALESCE(e.total_events, 0),
+    COALESCE(r.total_reviews, 0),
+    COALESCE(r.rating_sum, 0),
+    r.all_comments,
+    pr.min_single_price,
+    pr.min_group_price_per_person,
+    CURRENT_TIMESTAMP
+  FROM plan p
+  INNER JOIN tmp_rpt_dirty d ON d.plan_id = p.plan_id
+  LEFT JOIN venue v ON v.venue_id = p.venue_id
+  LEFT JOIN city y ON y.city_id = v.city_id
+  LEFT JOIN countries c ON c.country_id = y.country_id
+  LEFT JOIN category_main cm ON cm.category_main_id = p.category_main_id
+  LEFT JOIN LATERAL (
+    SELECT COUNT(DISTINCT ev.event_id) AS total_events
+    FROM event ev
+    WHERE ev.plan_id = p.plan_id
+  ) e ON true
+  LEFT JOIN LATERAL (
+    SELECT
+      COUNT(rv.review_id) AS total_reviews,
+      SUM(rv.rating) AS rating_sum,
+      STRING_AGG(rv.comment, ' | ') AS all_comments
+    FROM review rv
+    WHERE rv.plan_id = p.plan_id
+    AND rv.status = 'APPROVED'
+  ) r ON true
+  LEFT JOIN LATERAL (
+    SELECT
+      MIN(CASE WHEN pc.price_type = 'SINGLE' THEN pc.price_per_person_reporting END) AS min_single_price,
+      MIN(CASE WHEN pc.price_type != 'SINGLE' THEN pc.price_per_person_reporting END) AS min_group_price_per_person
+    FROM prices_converted pc
+    WHERE pc.plan_id = p.plan_id
+  ) pr ON true;
+
+  INSERT INTO rpt_plan_daily_tickets (plan_id, sale_date, tickets_sold)
+  SELECT
+    t.plan_id,
+    t.created_at::date,
+    SUM(t.quantity)
+  FROM ticket t
+  INNER JOIN tmp_rpt_dirty d ON d.plan_id = t.plan_id
+  WHERE t.status = 'PAID'
+  GROUP BY 1, 2;
+
+  -- Old and new plan facts of the dirty plans define the rollup rows to rebuild
+  DROP TABLE IF EXISTS tmp_rpt_touched;
+  CREATE TEMP TABLE tmp_rpt_touched ON COMMIT DROP AS
+  SELECT plan_status, city_name, day_of_week, venue_id, category_main_id FROM tmp_rpt_old_plans
+  UNION
+  SELECT s.plan_status, s.city_name, s.day_of_week, s.venue_id, s.category_main_id
+  FROM rpt_plan_stats s
+  INNER JOIN tmp_rpt_dirty d ON d.plan_id = s.plan_id;
+  ANALYZE tmp_rpt_touched;
+
+  -- ranked_days.sql
+  DELETE FROM rpt_city_weekday_plans r
+  USING tmp_rpt_touched k
+  WHERE r.city_name = k.city_name
+  AND r.day_of_week = k.day_of_week
+  AND r.plan_status = k.plan_status;
+
+  INSERT INTO rpt_city_weekday_plans (city_name, day_of_week, plan_status, plans_count)
+  SELECT s.city_name, s.day_of_week, s.plan_status, COUNT(*)
+  FROM rpt_plan_stats s
+  WHERE (s.city_name, s.day_of_week, s.plan_status) IN (
+    SELECT city_name, day_of_week, plan_status FROM tmp_rpt_touched
+  )
+  GROUP BY 1, 2, 3;
+
+  -- venue_events.sql
+  DELETE FROM rpt_venue_events r
+  USING tmp_rpt_touched k
+  WHERE r.venue_id = k.venue_id
+  AND r.plan_status = k.plan_status;
+
+  INSERT INTO rpt_venue_events (venue_id, plan_status, venue_name, total_events, total_plans)
+  SELECT s.venue_id, s.plan_status, MAX(s.venue_name), SUM(s.total_events), COUNT(*)
+  FROM rpt_plan_stats s
+  WHERE s.total_events > 0
+  AND (s.venue_id, s.plan_status) IN (
+    SELECT venue_id, plan_status FROM tmp_rpt_touched
+  )
+  GROUP BY 1, 2;
+
+  -- category_prices.sql
+  DELETE FROM rpt_category_prices r
+  USING tmp_rpt_touched k
+  WHERE r.category_main_id = k.category_main_id
+  AND r.plan_status = k.plan_status;
+
+  INSERT INTO rpt_category_prices (
+    category_main_id, plan_status, category_name, min_single_price, min_group_price_per_person)
+  SELECT
+    s.category_main_id,
+    s.plan_status,
+    MAX(s.category_name),
+    MIN(s.min_single_price),
+    MIN(s.min_group_price_per_person)
+  FROM rpt_plan_stats s
+  WHERE (s.min_single_price IS NOT NULL OR s.min_group_price_per_person IS NOT NULL)
+  AND (s.category_main_id, s.plan_status) IN (
+    SELECT category_main_id, plan_status FROM tmp_rpt_touched
+  )
+  GROUP BY 1, 2;
+
+  -- sold_plans.sql
+  INSERT INTO tmp_rpt_touched_tickets (country_name, plan_status, sale_date)
+  SELECT s.country_name, s.plan_status, t.sale_date
+  FROM rpt_plan_daily_tickets t
+  INNER JOIN tmp_rpt_dirty d ON d.plan_id = t.plan_id
+  INNER JOIN rpt_plan_stats s ON s.plan_id = t.plan_id;
+  ANALYZE tmp_rpt_touched_tickets;
+
+  DELETE FROM rpt_country_daily_tickets r
+  USING tmp_rpt_touched_tickets k
+  WHERE r.country_name = k.country_name
+  AND r.plan_status = k.plan_status
+  AND r.sale_date = k.sale_date;
+
+  INSERT INTO rpt_country_daily_tickets (country_name, plan_status, sale_date, tickets_sold)
+  SELECT s.country_name, s.plan_status, t.sale_date, SUM(t.tickets_sold)
+  FROM rpt_plan_daily_tickets t
+  INNER JOIN rpt_plan_stats s ON s.plan_id = t.plan_id
+  WHERE s.country_name IS NOT NULL
+  AND (s.country_name, s.plan_status, t.sale_date) IN (
+    SELECT country_name, plan_status, sale_date FROM tmp_rpt_touched_tickets
+  )
+  GROUP BY 1, 2, 3;
+
+  INSERT INTO refresh_watermarks (table_name, last_modified)
+  SELECT table_name, CURRENT_TIMESTAMP
+  FROM UNNEST(ARRAY[
+    'rpt_plan_stats', 'rpt_city_weekday_plans', 'rpt_country_daily_tickets',
+    'rpt_venue_events', 'rpt_category_prices'
+  ]) AS t(table_name)
+  ON CONFLICT (table_name)
+  DO UPDATE SET last_modified = EXCLUDED.last_modified;
+
+  RAISE NOTICE 'Report summaries refreshed';
+END;
+$$;
+
+-- Full rebuild, e.g. right after installing this script on existing data
+CREATE OR REPLACE PROCEDURE rebuild_report_summaries()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO rpt_dirty_plans (plan_id)
+  SELECT plan_id FROM plan
+  UNION
+  SELECT plan_id FROM rpt_plan_stats;
+
+  CALL refresh_report_summaries();
+END;
+$$;
+
+-- Usage:
+-- CALL rebuild_report_summaries();   -- once
+-- CALL refresh_report_summaries();   -- after each load, e.g. right after refresh_prices_converted()
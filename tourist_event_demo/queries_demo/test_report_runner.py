@@ -0,0 +1,130 @@
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from report_runner import REPORTS, WATERMARK_QUERY, ReportQuery, ReportRunner
+
+SQL = """
+-- Plans of the city (the comment must not count as a table)
+WITH city_plans AS (
+    SELECT plan_id, plan_status FROM rpt_plan_stats WHERE city_name = :city
+)
+SELECT c.plan_id, c.plan_status::text
+FROM city_plans c
+JOIN rpt_venue_events v ON v.plan_status = c.plan_status
+WHERE c.plan_status = :status
+"""
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        if statement is WATERMARK_QUERY:
+            tracked = len([t for t in params['tables'] if t in self.engine.watermarks])
+            marks = [self.engine.watermarks[t] for t in params['tables'] if t in self.engine.watermarks]
+            return SimpleNamespace(one=lambda: SimpleNamespace(tracked=tracked, last_modified=max(marks, default=None)))
+        self.engine.executed.append(params)
+        return [SimpleNamespace(_mapping={'params': dict(params)})]
+
+
+class FakeEngine:
+    """Records report executions and serves refresh_watermarks from a dict"""
+
+    def __init__(self, watermarks):
+        self.watermarks = watermarks
+        self.executed = []
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def runner():
+    tables = {table for name in REPORTS for table in ReportQuery.load(name).tables}
+    engine = FakeEngine({table: datetime(2024, 1, 1) for table in tables})
+    return ReportRunner(engine=engine)
+
+def test_query_params_and_tables():
+    """Binds skip ::casts, tables skip CTE names and comments"""
+    query = ReportQuery('test', SQL)
+    assert query.params == ['city', 'status']
+    assert query.tables == ['rpt_plan_stats', 'rpt_venue_events']
+
+def test_bind_defaults_and_filters():
+    query = ReportQuery('test', SQL)
+    assert query.bind({}) == {'city': None, 'status': 'ACTIVE'}
+    assert query.bind({'city': 'Madrid', 'status': None}) == {'city': 'Madrid', 'status': 'ACTIVE'}
+
+def test_bind_rejects_unsupported_filters():
+    """A report that cannot filter by a given param must not return unfiltered rows"""
+    with pytest.raises(ValueError, match="does not filter by: start_date"):
+        ReportQuery('test', SQL).bind({'start_date': '2024-01-01'})
+    with pytest.raises(ValueError, match="Unknown parameters"):
+        ReportQuery('test', SQL).bind({'country': 'Spain'})
+    with pytest.raises(ValueError, match="does not filter by: city"):
+        ReportQuery.load('venue_events').bind({'city': 'Madrid'})
+
+def test_run_caches_until_watermark_moves(runner):
+    first = runner.run('ranked_days', city='Madrid')
+    assert runner.run('ranked_days', city='Madrid') == first
+    assert len(runner.engine.executed) == 1
+
+    # Different params are a different entry
+    runner.run('ranked_days', city='Sevilla')
+    assert len(runner.engine.executed) == 2
+
+    for table in runner.queries['ranked_days'].tables:
+        runner.engine.watermarks[table] = datetime(2024, 1, 2)
+    runner.run('ranked_days', city='Madrid')
+    assert len(runner.engine.executed) == 3
+
+def test_run_returns_private_rows(runner):
+    """Callers mutating their rows do not change what later calls get"""
+    first = runner.run('ranked_days', city='Madrid')
+    first[0]['params'] = None
+    first.append({'params': None})
+
+    second = runner.run('ranked_days', city='Madrid')
+    assert second == [{'params': {'city': 'Madrid', 'status': 'ACTIVE'}}]
+    second[0]['params'] = None
+    second.clear()
+
+    assert len(runner.run('ranked_days', city='Madrid')) == 1
+    assert len(runner.engine.executed) == 1
+
+def test_run_shared_between_threads(runner):
+    """Concurrent runs evicting each other keep the cache within its size"""
+    runner.cache_size = 2
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: runner.run('ranked_days', city=f'City {i % 5}'), range(200)))
+
+    assert all(len(rows) == 1 for rows in results)
+    assert len(runner._cache) <= 2
+
+def test_run_skips_cache_for_untracked_tables(runner):
+    del runner.engine.watermarks[runner.queries['sold_plans'].tables[0]]
+    runner.run('sold_plans')
+    runner.run('sold_plans')
+    assert len(runner.engine.executed) == 2
+
+def test_invalidate(runner):
+    runner.run('venue_events')
+    runner.run('category_prices')
+    runner.invalidate('venue_events')
+    runner.run('venue_events')
+    runner.run('category_prices')
+    assert len(runner.engine.executed) == 3
+
+    runner.invalidate()
+    runner.run('category_prices')
+    assert len(runner.engine.executed) == 4
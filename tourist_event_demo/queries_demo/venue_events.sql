@@ -1,12 +1,11 @@
+-- Reads the summary maintained by report_summaries.sql
 WITH venue_events AS (
   SELECT 
-    v.venue_name,
-    COUNT(DISTINCT e.event_id) as total_events,
-    COUNT(DISTINCT p.plan_id) as total_plans
-  FROM venue v
-  INNER JOIN plan p ON p.venue_id = v.venue_id
-  INNER JOIN event e ON e.plan_id = p.plan_id
-  WHERE p.status = 'ACTIVE'
+    venue_name,
+    SUM(total_events) as total_events,
+    SUM(total_plans) as total_plans
+  FROM rpt_venue_events
+  WHERE plan_status = :status
   GROUP BY 1
 )
 SELECT 